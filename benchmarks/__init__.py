@@ -0,0 +1,2 @@
+# Benchmarks for the prediction path; run each module with python -m from the project root.
+# python -m benchmarks.run runs the whole suite and writes JSON results.
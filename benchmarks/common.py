@@ -0,0 +1,66 @@
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+
+def setup_django():
+    """Configure Django for in-process benchmarks; call before importing mediapp"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicost.settings')
+    import django
+    django.setup()
+
+
+def timings(fn, repeat, warmup=1):
+    """
+    Call fn repeatedly and summarize the wall time of each call
+    Args:
+        fn: zero-argument callable
+        repeat: number of timed calls
+        warmup: untimed calls made first
+    Returns:
+        dict: n, min_s, median_s, mean_s, p95_s, max_s
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'min_s': samples[0],
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.fmean(samples),
+        'p95_s': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max_s': samples[-1],
+    }
+
+
+def environment():
+    """Versions and host details stored with every result file"""
+    import django
+    import numpy
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'django': django.__version__,
+        'numpy': numpy.__version__,
+        'sklearn': sklearn.__version__,
+    }
@@ -0,0 +1,129 @@
+"""
+Write throughput of prediction_new under parallel load on the configured database.
+
+Usage: python -m benchmarks.db_writes [--threads 1 4 16] [--requests 400]
+
+Runs against a throwaway test database on whatever backend the DB_*
+environment selects: SQLite (a temporary file, so locking is real) with or
+without WAL, or PostgreSQL with or without the connection pool, e.g.
+
+    python -m benchmarks.db_writes
+    DB_SQLITE_WAL=0 python -m benchmarks.db_writes
+    DB_ENGINE=postgresql DB_NAME=medicost DB_USER=postgres python -m benchmarks.db_writes
+
+Each thread has its own logged-in test client and database connection and
+POSTs prediction_new, which saves a Prediction and updates the user's
+totals in one transaction.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import environment, setup_django, summarize
+
+
+def _post_many(username, count, latencies, errors):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    try:
+        for i in range(count):
+            start = time.perf_counter()
+            response = client.post('/prediction/new/', {
+                'age': 18 + i % 47, 'gender': 'female', 'bmi': f'{20 + (i % 2000) / 100:.2f}',
+                'children': i % 4, 'smoker': 'no', 'region': 'northwest',
+            })
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 302:
+                errors.append(response.status_code)
+    finally:
+        connection.close()
+
+
+def bench_writes(threads, total):
+    from django.contrib.auth.models import User
+
+    from mediapp.models import Prediction
+
+    usernames = [f'bench-writer-{threads}-{i}' for i in range(threads)]
+    for username in usernames:
+        User.objects.create_user(username=username, password='benchmark')
+    before = Prediction.objects.count()
+
+    latencies, errors = [], []
+    per_thread = total // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(_post_many, u, per_thread, latencies, errors) for u in usernames]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    written = Prediction.objects.count() - before
+    return {
+        'threads': threads,
+        'requests': per_thread * threads,
+        'written': written,
+        'errors': len(errors),
+        'writes_per_s': written / elapsed,
+        'latency': summarize(latencies),
+    }
+
+
+def backend_info():
+    from django.db import connection
+
+    info = {'vendor': connection.vendor, 'options': {
+        k: v for k, v in connection.settings_dict['OPTIONS'].items() if k != 'password'
+    }, 'conn_max_age': connection.settings_dict['CONN_MAX_AGE']}
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            info['journal_mode'] = cursor.fetchone()[0]
+    return info
+
+
+def run(args):
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from medicost.db import enable_sqlite_wal
+
+    # As the server does; DB_SQLITE_WAL=0 benchmarks the rollback journal
+    enable_sqlite_wal()
+    setup_test_environment()
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            # In-memory test databases are per connection; use a real file
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        # create_test_db returns the test database's name; destroy_test_db
+        # needs the original one to point the connection back at it
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            return {
+                'backend': backend_info(),
+                'runs': [bench_writes(threads, args.db_requests) for threads in args.db_threads],
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', dest='db_threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', dest='db_requests', type=int, default=400, help='POSTs per run, split across threads')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps({'environment': environment(), 'results': run(args)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
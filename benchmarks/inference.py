@@ -0,0 +1,82 @@
+"""
+Single-call predict() latency and vectorized batch throughput.
+"""
+import numpy as np
+
+from .common import summarize, timings
+
+BATCH_SIZES = (1, 100, 10_000, 1_000_000)
+
+
+def raw_columns(rows, seed=0):
+    """Random applicants as raw columns, the way score_file and batch requests see them"""
+    rng = np.random.default_rng(seed)
+    return {
+        'age': rng.integers(18, 65, rows),
+        'sex': rng.choice(['male', 'female'], rows),
+        'bmi': rng.uniform(15, 45, rows).round(2),
+        'children': rng.integers(0, 6, rows),
+        'smoker': rng.choice(['yes', 'no'], rows),
+        'region': rng.choice(['northeast', 'northwest', 'southeast', 'southwest'], rows),
+    }
+
+
+def bench_predict(repeat):
+    import time
+
+    from mediapp.ml_models.cache import prediction_cache
+    from mediapp.ml_models.predict import predict
+    from mediapp.ml_models.registry import registry
+
+    applicant = dict(age=40, sex='male', bmi=30.5, children=2, smoker='no', region='southeast')
+
+    # Cold: first call after a reload, including reading the artifact
+    registry.reload()
+    prediction_cache.clear()
+    start = time.perf_counter()
+    predict(**applicant)
+    cold = time.perf_counter() - start
+
+    # Cache misses: every call has a BMI not seen before
+    columns = raw_columns(repeat, seed=1)
+    misses = []
+    for i in range(repeat):
+        applicant_i = {name: values[i].item() for name, values in columns.items()}
+        applicant_i['bmi'] = 15 + i / 100
+        start = time.perf_counter()
+        predict(**applicant_i)
+        misses.append(time.perf_counter() - start)
+
+    return {
+        'serving_path': registry.info(),
+        'cold_s': cold,
+        'cache_hit': timings(lambda: predict(**applicant), repeat),
+        'cache_miss': summarize(misses),
+    }
+
+
+def bench_batch(sizes, repeat):
+    from mediapp.ml_models.encoding import encode_columns
+    from mediapp.ml_models.predict import predict_batch
+
+    results = {}
+    for rows in sizes:
+        columns = raw_columns(rows)
+        X = encode_columns(columns)
+        # Fewer repeats for the big batches so the suite stays bounded
+        n = max(3, min(repeat, 1_000_000 // rows))
+        encode = timings(lambda: encode_columns(columns), n)
+        score = timings(lambda: predict_batch(X), n)
+        results[str(rows)] = {
+            'encode': encode,
+            'score': score,
+            'rows_per_s': rows / (encode['median_s'] + score['median_s']),
+        }
+    return results
+
+
+def run(args):
+    return {
+        'predict': bench_predict(args.repeat),
+        'batch': bench_batch(args.batch_sizes, args.repeat),
+    }
@@ -0,0 +1,58 @@
+"""
+Compare sklearn's LinearRegression.predict with the coefficient-table scorer.
+
+Usage: python -m benchmarks.linear_scorer [--rows N] [--repeat R]
+"""
+import argparse
+import os
+import timeit
+import warnings
+
+import joblib
+import numpy as np
+
+from mediapp.ml_models.artifacts import load_coef_table, model_version, score_coef_table
+
+MODEL_PATH = os.path.join('mediapp', 'ml_models', 'insurance_model.pkl')
+
+
+def random_inputs(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(18, 65, rows),
+        rng.integers(0, 2, rows),
+        rng.uniform(15, 45, rows),
+        rng.integers(0, 6, rows),
+        rng.integers(0, 2, rows),
+        rng.integers(0, 4, rows),
+    ]).astype(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(MODEL_PATH)
+    table = load_coef_table(MODEL_PATH, model_version(MODEL_PATH))
+    if table is None:
+        raise SystemExit(f'No coefficient table for {MODEL_PATH}; run train_model first')
+
+    X = random_inputs(args.rows)
+    expected = model.predict(X)
+    actual = score_coef_table(X, table)
+    if not np.array_equal(expected.view(np.int64), actual.view(np.int64)):
+        raise SystemExit('Coefficient table scorer differs from sklearn')
+    print(f'bit-for-bit equal on {args.rows} rows')
+
+    one = X[:1]
+    for label, rows, n in (('1 row', one, args.repeat), (f'{args.rows} rows', X, max(args.repeat // 100, 1))):
+        sk = min(timeit.repeat(lambda: model.predict(rows), number=n, repeat=5)) / n
+        cf = min(timeit.repeat(lambda: score_coef_table(rows, table), number=n, repeat=5)) / n
+        print(f'{label:>12}: sklearn {sk * 1e6:9.2f} us  table {cf * 1e6:9.2f} us  speedup {sk / cf:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Load-test the prediction pages of a running server at high concurrency.
+
+Start the server under test, then point this script at it, e.g.
+
+    gunicorn medicost.wsgi -w 4 --preload
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --username u --password p
+
+and for the async views (settings.ASYNC_VIEWS = True)
+
+    uvicorn medicost.asgi:application --workers 4
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --username u --password p
+
+Each request POSTs prediction_new and follows the redirect to the result
+page, so it covers inference, the ORM writes and template rendering.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+APPLICANT = {'age': 40, 'gender': 'male', 'bmi': '30.5', 'children': 2, 'smoker': 'no', 'region': 'southeast'}
+
+
+def csrf_token(jar):
+    return next((c.value for c in jar if c.name == 'csrftoken'), '')
+
+
+def login(base_url, username, password):
+    """Return an opener carrying an authenticated session cookie"""
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.open(f'{base_url}/login/').read()
+    data = urllib.parse.urlencode({
+        'username': username, 'password': password, 'csrfmiddlewaretoken': csrf_token(jar),
+    }).encode()
+    response = opener.open(f'{base_url}/login/', data)
+    if '/login/' in response.geturl():
+        raise SystemExit('Login failed')
+    return opener, jar
+
+
+def run(base_url, opener, jar, total, concurrency):
+    body = urllib.parse.urlencode({**APPLICANT, 'csrfmiddlewaretoken': csrf_token(jar)}).encode()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            with opener.open(f'{base_url}/prediction/new/', body) as response:
+                response.read()
+                ok = '/result/' in response.geturl()
+        except OSError:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': total / wall,
+        'latency_ms': {
+            'mean': statistics.mean(latencies) * 1000,
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64, 256])
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    opener, jar = login(base_url, args.username, args.password)
+    results = [run(base_url, opener, jar, args.requests, c) for c in args.concurrency]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Run the benchmark suite and write the results as JSON.
+
+Usage: python -m benchmarks.run [--only startup inference views db_writes training trees] [--output results.json]
+                                [--compare previous.json] [--quick]
+
+Compare two runs by passing the older file to --compare; every median
+latency and throughput is printed with its ratio to the old value.
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+from .common import environment, setup_django
+
+SUITES = ('startup', 'inference', 'views', 'db_writes', 'training', 'trees')
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(old, new):
+    # Medians and rates only: min/max are too noisy to flag regressions on
+    old_values = dict(flatten(old.get('results', {})))
+    for name, value in flatten(new['results']):
+        if not name.endswith(('median_s', 'rows_per_s', '_s')) or name.endswith(('min_s', 'max_s', 'p95_s', 'mean_s')):
+            continue
+        before = old_values.get(name)
+        if before:
+            print(f'{name:<70} {before:12.6g} -> {value:12.6g}  x{value / before:6.2f}', file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer repeats for a smoke run')
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per latency measurement')
+    parser.add_argument('--cv', type=int, default=5, help='cross-validation folds for the training timings')
+    parser.add_argument('--db-threads', type=int, nargs='+', default=[1, 4, 16], help='writer threads for db_writes')
+    parser.add_argument('--db-requests', type=int, default=400, help='prediction_new POSTs per db_writes run')
+    args = parser.parse_args()
+
+    from .inference import BATCH_SIZES
+    from .views import DASHBOARD_SIZES
+
+    args.batch_sizes = BATCH_SIZES
+    args.dashboard_sizes = DASHBOARD_SIZES
+    if args.quick:
+        args.repeat = min(args.repeat, 20)
+        args.cv = min(args.cv, 2)
+        args.batch_sizes = BATCH_SIZES[:3]
+        args.dashboard_sizes = DASHBOARD_SIZES[:2]
+        args.db_threads = args.db_threads[:2]
+        args.db_requests = min(args.db_requests, 100)
+
+    setup_django()
+    from . import db_writes, inference, startup, training, trees, views
+    modules = {'startup': startup, 'inference': inference, 'views': views, 'db_writes': db_writes, 'training': training,
+               'trees': trees}
+
+    results = {}
+    for name in args.only:
+        print(f'Running {name} benchmarks...', file=sys.stderr)
+        # Keep training's progress prints out of the JSON on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            results[name] = modules[name].run(args)
+
+    report = {'environment': environment(), 'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+              'results': results}
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Import-time report for startup paths, from python -X importtime in a fresh process.
+
+Each scenario runs in its own interpreter so nothing is already imported;
+the report lists total import time, the slowest top-level imports and
+which heavy libraries the path pulled in.
+"""
+import os
+import subprocess
+import sys
+import time
+
+# Libraries that should never be imported just to serve pages or run migrate
+HEAVY_MODULES = ('numpy', 'joblib', 'pandas', 'scipy', 'sklearn', 'xgboost', 'matplotlib', 'seaborn')
+
+SETUP = "import django; django.setup(); "
+SCENARIOS = {
+    # What a WSGI worker imports before its first request: medicost.wsgi,
+    # which preloads the model's side tables when MODEL_PRELOAD is on
+    'worker_boot': "import medicost.wsgi, medicost.urls, mediapp.async_views, mediapp.admin",
+    # The same with MODEL_PRELOAD off, where the model loads on first use
+    'worker_boot_no_preload': SETUP + "from django.conf import settings; settings.MODEL_PRELOAD = False; "
+                                      "import medicost.wsgi, medicost.urls, mediapp.async_views, mediapp.admin",
+    'manage_check': None,
+    # The model stack pulled in by the first quote
+    'first_prediction': SETUP + "import medicost.urls; from mediapp.ml_models.predict import predict; "
+                                "predict(40, 'male', 30.5, 2, 'no', 'southeast')",
+}
+
+
+def parse_importtime(stderr, top=10):
+    """
+    Summarize `-X importtime` output
+    Returns:
+        dict: total_s, heavy modules imported, slowest top-level imports
+    """
+    total_us = 0
+    top_level = []
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        modules.add(name.strip().split('.')[0])
+        # Top-level imports are the ones with no indentation after the bar
+        if not name[1:].startswith(' '):
+            top_level.append((int(cumulative_us), name.strip()))
+    top_level.sort(reverse=True)
+    return {
+        'total_import_s': total_us / 1e6,
+        'heavy_modules': sorted(modules & set(HEAVY_MODULES)),
+        'slowest': [{'module': name, 'cumulative_s': us / 1e6} for us, name in top_level[:top]],
+    }
+
+
+def run(args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='medicost.settings')
+    results = {}
+    for name, code in SCENARIOS.items():
+        command = [sys.executable, '-X', 'importtime']
+        command += ['manage.py', 'check'] if code is None else ['-c', code]
+        start = time.perf_counter()
+        proc = subprocess.run(command, capture_output=True, text=True, env=env)
+        elapsed = time.perf_counter() - start
+        if proc.returncode:
+            raise RuntimeError(f'{name} failed: {proc.stderr[-2000:]}')
+        results[name] = {'wall_s': elapsed, **parse_importtime(proc.stderr)}
+    return results
@@ -0,0 +1,117 @@
+"""
+Flattened tree-ensemble runtime against the native sklearn/xgboost estimators.
+
+Each tree candidate is trained, saved and exported with save_best_model,
+then both scorers are timed on one row and on batches, checked against
+each other, and loaded in a fresh interpreter to compare resident memory,
+both for scoring alone and for the request path (predict() and explain()
+through the registry, as prediction_new runs them).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import warnings
+
+import numpy as np
+
+from .common import timings
+
+TREE_MODELS = ('RandomForest', 'XGBoost')
+BATCH_SIZES = (16, 128, 1024)
+
+# Resident memory of a fresh process before and after it loads one artifact
+# (and the libraries it needs) and prices one applicant
+MEMORY_PROBE = """
+import os, sys
+import django
+import numpy as np
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+path, mode = sys.argv[1], sys.argv[2]
+django.setup()
+X = np.array([[40, 0, 30.5, 2, 0, 2]], dtype=np.float64)
+before = rss()
+if mode == 'native':
+    import joblib
+    model = joblib.load(path)
+    model[1:].predict(X)
+elif mode == 'flat':
+    from mediapp.ml_models.artifacts import model_version
+    from mediapp.ml_models.trees import load_tree_ensemble, score_tree_ensemble
+    score_tree_ensemble(X, load_tree_ensemble(path, model_version(path)))
+else:
+    from django.conf import settings
+    settings.MODEL_PATH = path
+    from mediapp.ml_models.predict import explain, predict
+    predict(40, 'male', 30.5, 2, 'no', 'southeast')
+    explain(40, 'male', 30.5, 2, 'no', 'southeast')
+print(before, rss(), int('sklearn' in sys.modules or 'xgboost' in sys.modules))
+"""
+
+# native: joblib pipeline; flat: node array alone; predict_explain: the request path
+MEMORY_MODES = ('native', 'flat', 'predict_explain')
+
+
+def rss_mb(path, mode):
+    # Linux only: RSS comes from /proc; None where that is unavailable
+    if not os.path.exists('/proc/self/statm'):
+        return None
+    proc = subprocess.run([sys.executable, '-c', MEMORY_PROBE, path, mode], capture_output=True, text=True,
+                          env=dict(os.environ, PYTHONPATH=os.getcwd(), DJANGO_SETTINGS_MODULE='medicost.settings'))
+    if proc.returncode:
+        raise RuntimeError(f'memory probe failed: {proc.stderr[-2000:]}')
+    before, after, native_libs = (int(v) for v in proc.stdout.split())
+    return {'baseline_mb': before / (1 << 20), 'loaded_mb': after / (1 << 20), 'delta_mb': (after - before) / (1 << 20),
+            'imported_sklearn_or_xgboost': bool(native_libs)}
+
+
+def run(args):
+    from mediapp.ml_models import train_model
+    from mediapp.ml_models.artifacts import model_version
+    from mediapp.ml_models.trees import load_tree_ensemble, score_tree_ensemble, tree_ensemble_paths
+
+    warnings.filterwarnings('ignore')
+    data = train_model.load_and_preprocess_data()
+    X_train, X_test, y_train, y_test = train_model.prepare_model_data(data)
+    candidates = train_model.candidate_models()
+    rng = np.random.default_rng(0)
+    rows = np.asarray(X_test, dtype=np.float64)[rng.integers(0, len(X_test), max(BATCH_SIZES))]
+    row = rows[:1]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in TREE_MODELS:
+            fitted = train_model._run_task(name, candidates[name], None, X_train, y_train, X_test)['model']
+            path = os.path.join(tmp, f'{name}.pkl')
+            train_model.save_best_model({name: fitted}, X_train, path=path, name=name)
+            ensemble = load_tree_ensemble(path, model_version(path))
+            npy_path, meta_path = tree_ensemble_paths(path)
+            native = fitted[1:]
+
+            repeat = max(5, args.repeat // 10) if name == 'RandomForest' else args.repeat
+            results[name] = {
+                'nodes': len(ensemble['nodes']),
+                'depth': ensemble['depth'],
+                'max_abs_diff': float(np.abs(native.predict(rows) - score_tree_ensemble(rows, ensemble)).max()),
+                'artifact_bytes': {
+                    'native': os.path.getsize(path),
+                    'flat': os.path.getsize(npy_path) + os.path.getsize(meta_path),
+                },
+                'one_row': {
+                    'native': timings(lambda: native.predict(row), repeat),
+                    'flat': timings(lambda: score_tree_ensemble(row, ensemble), args.repeat),
+                },
+                'memory': {mode: rss_mb(path, mode) for mode in MEMORY_MODES},
+            }
+            # Where the vectorized walk stops paying off (see TREE_ENSEMBLE_MAX_ROWS)
+            for size in BATCH_SIZES:
+                batch = rows[:size]
+                results[name][f'batch_{size}'] = {
+                    'native': timings(lambda: native.predict(batch), max(3, repeat // 10)),
+                    'flat': timings(lambda: score_tree_ensemble(batch, ensemble), max(3, args.repeat // 10)),
+                }
+    return results
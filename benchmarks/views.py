@@ -0,0 +1,94 @@
+"""
+Full Django requests through the test client: prediction_new and the dashboard.
+
+Runs against a throwaway test database, never the project's own.
+"""
+import datetime
+import io
+from unittest import mock
+
+from .common import timings
+
+DASHBOARD_SIZES = (10, 1_000, 100_000)
+
+
+def _user(username):
+    from django.contrib.auth.models import User
+    return User.objects.create_user(username=username, password='benchmark')
+
+
+def _client(user):
+    from django.test import Client
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def bench_prediction_new(repeat):
+    client = _client(_user('bench-new'))
+    counter = iter(range(10 ** 9))
+
+    def post():
+        # Distinct BMIs so each request runs inference instead of hitting the cache
+        i = next(counter)
+        response = client.post('/prediction/new/', {
+            'age': 18 + i % 47, 'gender': 'male', 'bmi': f'{15 + (i % 3000) / 100:.2f}',
+            'children': i % 6, 'smoker': 'no', 'region': 'southeast',
+        })
+        assert response.status_code == 302, response.status_code
+
+    return timings(post, repeat)
+
+
+def _fill(user, count, days=365):
+    # Spread rows over `days` days so the chart has one point per day
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from mediapp.models import Prediction
+
+    now = timezone.now()
+    per_day = -(-count // days)
+    created = 0
+    for day in range(days):
+        n = min(per_day, count - created)
+        if n <= 0:
+            break
+        rows = [
+            Prediction(user=user, age=18 + i % 47, gender='female', bmi=20 + i % 20, children=i % 4,
+                       smoker='no', region='northwest', predicted_cost=1000.0 + i)
+            for i in range(created, created + n)
+        ]
+        with mock.patch('django.utils.timezone.now', return_value=now - datetime.timedelta(days=days - day)):
+            Prediction.objects.bulk_create(rows, batch_size=1000)
+        created += n
+    call_command('rebuild_prediction_stats', user=user.username, stdout=io.StringIO())
+
+
+def bench_dashboard(sizes, repeat):
+    results = {}
+    for size in sizes:
+        user = _user(f'bench-dashboard-{size}')
+        _fill(user, size)
+        client = _client(user)
+        results[str(size)] = timings(lambda: client.get('/dashboard/'), repeat)
+    return results
+
+
+def run(args):
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    # create_test_db returns the test database's name; destroy_test_db
+    # needs the original one to point the connection back at it
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        return {
+            'prediction_new': bench_prediction_new(args.repeat),
+            'dashboard': bench_dashboard(args.dashboard_sizes, max(5, args.repeat // 20)),
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
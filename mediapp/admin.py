@@ -1,6 +1,13 @@
 
 from django.contrib import admin
-from .models import Profile, Prediction
+from .models import Profile, Prediction, PredictionStats, OutboxEmail
 
 admin.site.register(Profile)
 admin.site.register(Prediction)
+admin.site.register(PredictionStats)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
@@ -0,0 +1,83 @@
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+from .forms import PredictionForm
+from .metrics import timed
+from .models import Prediction, PredictionStats
+from .pagination import akeyset_page
+from .views import (
+    daily_costs, dashboard_context, explain_prediction, history_columns, result_context, save_prediction,
+    what_if_context,
+)
+
+# Async counterparts of the prediction views for ASGI deployments (enable
+# with settings.ASYNC_VIEWS). Queries use the async ORM, all model work
+# (pricing, explanations, what-if) runs in the bounded inference pool, and
+# the remaining sync work (the save transaction, template rendering) is
+# handed to a worker thread.
+
+arender = sync_to_async(timed('render')(render))
+
+
+@login_required
+async def dashboard(request):
+    user = await request.auser()
+    predictions = Prediction.objects.filter(user=user)
+
+    stats = await PredictionStats.afor_user(user)
+    daily = [row async for row in daily_costs(predictions, stats)]
+    cursor = request.GET.get('cursor')
+    page, next_cursor = await akeyset_page(history_columns(predictions), cursor)
+
+    context = dashboard_context(stats, daily, page, next_cursor, cursor)
+    return await arender(request, 'mediapp/dashboard.html', context)
+
+
+@login_required
+async def prediction_new(request):
+    if request.method == 'POST':
+        form = PredictionForm(request.POST)
+        if form.is_valid():
+            prediction = form.save(commit=False)
+            prediction.user = await request.auser()
+
+            # The model stack is imported on the first prediction, not at startup
+            from .ml_models.predict import apredict, run_in_inference_pool
+            try:
+                cost = await apredict(
+                    age=prediction.age,
+                    sex=prediction.gender,
+                    bmi=prediction.bmi,
+                    children=prediction.children,
+                    smoker=prediction.smoker,
+                    region=prediction.region
+                )
+                prediction.predicted_cost = round(cost, 2)
+                await run_in_inference_pool(explain_prediction, prediction)
+                await sync_to_async(save_prediction)(prediction)
+                messages.success(request, 'Prediction successful!')
+                return redirect('prediction_result', prediction_id=prediction.id)
+            except Exception as e:
+                messages.error(request, f'Prediction error: {str(e)}')
+    else:
+        form = PredictionForm()
+    return await arender(request, 'mediapp/prediction_form.html', {'form': form})
+
+
+@login_required
+async def prediction_result(request, prediction_id):
+    user = await request.auser()
+    try:
+        prediction = await Prediction.objects.aget(id=prediction_id, user=user)
+    except Prediction.DoesNotExist:
+        messages.error(request, 'Prediction not found.')
+        return redirect('dashboard')
+
+    from .ml_models.predict import run_in_inference_pool
+
+    stats = await PredictionStats.afor_user(user)
+    context = result_context(prediction, stats.avg_cost)
+    context['what_if'] = await run_in_inference_pool(what_if_context, prediction)
+    return await arender(request, 'mediapp/prediction_result.html', context)
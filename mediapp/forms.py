@@ -26,7 +26,9 @@ class PredictionForm(forms.ModelForm):
         bmi = self.cleaned_data['bmi']
         if bmi < 10 or bmi > 50:
             raise forms.ValidationError("Please enter a valid BMI between 10 and 50.")
-        return bmi
+        # Rounded as the model input is, so the stored BMI is the priced one
+        from .ml_models.encoding import quantize_bmi
+        return quantize_bmi(bmi)
         
     def clean_children(self):
         children = self.cleaned_data['children']
@@ -45,3 +47,28 @@ class ContactForm(forms.Form):
     email = forms.EmailField(widget=forms.EmailInput(attrs={'class': 'form-control'}))
     subject = forms.CharField(max_length=200, widget=forms.TextInput(attrs={'class': 'form-control'}))
     message = forms.CharField(widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 5}))
+
+
+def clean_batch(X, first_row=0):
+    """
+    Apply PredictionForm's range checks to an encoded batch in one pass
+    Args:
+        X: (n, 6) array from predict.encode_batch
+        first_row: number reported for X's first row in the messages
+    Returns:
+        list: error messages, empty when every row is valid
+    """
+    import numpy as np
+
+    # Comparisons with NaN are always false, so non-finite values are rejected explicitly
+    finite = np.isfinite(X)
+    checks = [
+        (~finite[:, 0] | (X[:, 0] < 0) | (X[:, 0] > 120) | (X[:, 0] % 1 != 0), "Please enter a valid age between 0 and 120."),
+        (~finite[:, 2] | (X[:, 2] < 10) | (X[:, 2] > 50), "Please enter a valid BMI between 10 and 50."),
+        (~finite[:, 3] | (X[:, 3] < 0) | (X[:, 3] % 1 != 0), "Number of children cannot be negative."),
+    ]
+    errors = []
+    for invalid, message in checks:
+        for row in np.flatnonzero(invalid)[:10]:
+            errors.append(f"Row {first_row + row}: {message}")
+    return errors
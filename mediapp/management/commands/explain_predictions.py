@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mediapp.ml_models.encoding import encode_columns
+from mediapp.ml_models.predict import explain_batch
+from mediapp.ml_models.schema import FEATURES
+from mediapp.models import Prediction
+
+
+METHOD_NAMES = {'exact': 'exact linear contributions', 'path': 'approximate tree path attribution'}
+
+
+class Command(BaseCommand):
+    help = 'Store per-feature cost contributions on predictions saved without them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='recompute every prediction, e.g. after deploying a new model')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='predictions explained per model call')
+
+    def handle(self, *args, **options):
+        predictions = Prediction.objects.order_by('id')
+        if not options['all']:
+            predictions = predictions.filter(contributions__isnull=True)
+
+        updated = 0
+        last_id = 0
+        methods = set()
+        while True:
+            chunk = list(predictions.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            columns = {
+                feature: [getattr(p, field) for p in chunk]
+                for feature, field in zip(FEATURES, Prediction.CONTRIBUTION_FIELDS)
+            }
+            explanation = explain_batch(encode_columns(columns))
+            if explanation is None:
+                raise CommandError('The serving model has no fast per-feature explanation')
+            methods.add(explanation['method'])
+            for row, prediction in enumerate(chunk):
+                prediction.set_explanation(explanation, row)
+            Prediction.objects.bulk_update(chunk, ['model_version', 'base_cost', 'contributions'])
+            updated += len(chunk)
+        # Tree models are explained by path attribution, which approximates
+        # but is not TreeSHAP; say so rather than pass it off as exact
+        described = ', '.join(METHOD_NAMES[m] for m in sorted(methods))
+        self.stdout.write(self.style.SUCCESS(f'Explained {updated} predictions' + (f' ({described})' if described else '')))
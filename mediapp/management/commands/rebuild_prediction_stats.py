@@ -0,0 +1,82 @@
+import math
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from mediapp.models import Prediction, PredictionStats
+
+
+def _differs(stored, actual):
+    # Running float sums drift from a fresh SUM() by rounding error only
+    if isinstance(stored, float) and isinstance(actual, float):
+        return not math.isclose(stored, actual, rel_tol=1e-9)
+    return stored != actual
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair per-user prediction totals from the Prediction table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='only rebuild this username')
+        parser.add_argument('--check', action='store_true',
+                            help='report users whose totals are out of date without changing them')
+
+    def handle(self, *args, **options):
+        predictions = Prediction.objects.all()
+        stats = PredictionStats.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']}")
+            predictions = predictions.filter(user=user)
+            stats = stats.filter(user=user)
+
+        # One grouped query computes the true totals for every user
+        rows = predictions.values('user').annotate(
+            count=Count('id'),
+            priced_count=Count('predicted_cost'),
+            total_cost=Sum('predicted_cost'),
+            min_cost=Min('predicted_cost'),
+            max_cost=Max('predicted_cost'),
+            last_created_at=Max('created_at'),
+        )
+        expected = {
+            row['user']: PredictionStats(
+                user_id=row['user'],
+                count=row['count'],
+                priced_count=row['priced_count'],
+                total_cost=row['total_cost'] or 0,
+                min_cost=row['min_cost'],
+                max_cost=row['max_cost'],
+                last_created_at=row['last_created_at'],
+            )
+            for row in rows
+        }
+
+        fields = ['count', 'priced_count', 'total_cost', 'min_cost', 'max_cost', 'last_created_at']
+        current = {s.user_id: s for s in stats}
+        stale = [
+            user_id for user_id, row in expected.items()
+            if user_id not in current or any(_differs(getattr(current[user_id], f), getattr(row, f)) for f in fields)
+        ]
+        orphaned = [user_id for user_id in current if user_id not in expected]
+
+        if options['check']:
+            self.stdout.write(f'{len(stale)} stale and {len(orphaned)} orphaned stats rows')
+            return
+
+        with transaction.atomic():
+            PredictionStats.objects.bulk_create(
+                [expected[user_id] for user_id in stale],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=fields,
+                batch_size=1000,
+            )
+            PredictionStats.objects.filter(user_id__in=orphaned).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {len(stale)} users, removed {len(orphaned)} orphaned rows'
+        ))
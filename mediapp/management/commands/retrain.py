@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max
+
+from mediapp.ml_models import train_model
+from mediapp.models import Prediction
+
+
+class Command(BaseCommand):
+    help = (
+        'Retrain the insurance cost model without plots, skipping the run '
+        'when the training data and hyperparameters are unchanged'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', default=train_model.DATA_PATH, help='training CSV in the insurance.csv schema')
+        parser.add_argument('--output', default=train_model.MODEL_PATH, help='where to save the model artifact')
+        parser.add_argument('--jobs', type=int, default=-1, help='worker processes (-1 uses all cores)')
+        parser.add_argument('--cv', type=int, default=10, help='cross-validation folds')
+        parser.add_argument('--include-predictions', action='store_true',
+                            help='also train on stored Prediction rows, using predicted_cost as charges')
+        parser.add_argument('--model', default='LinearRegression', choices=list(train_model.candidate_models()),
+                            help='candidate to save and serve')
+        parser.add_argument('--no-price-grid', action='store_true',
+                            help='do not precompute the quote lookup grid for linear models')
+        parser.add_argument('--no-data-cache', action='store_true',
+                            help='parse the CSV even if an encoded copy is cached')
+        parser.add_argument('--params', help='JSON of tuned hyperparameters by model name, from search_hyperparameters')
+        parser.add_argument('--plots', action='store_true', help='render EDA and comparison plots')
+        parser.add_argument('--force', action='store_true', help='retrain even if nothing changed')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['data']):
+            raise CommandError(f"Training data not found at {options['data']}")
+        # Checked before training, so a mistyped --output fails in seconds
+        output_dir = os.path.dirname(os.path.abspath(options['output']))
+        if not os.path.isdir(output_dir):
+            raise CommandError(f'Output directory {output_dir} does not exist')
+        if not os.access(output_dir, os.W_OK):
+            raise CommandError(f'Output directory {output_dir} is not writable')
+
+        params = None
+        if options['params']:
+            try:
+                with open(options['params']) as f:
+                    params = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read hyperparameters from {options['params']}: {e}")
+
+        predictions = None
+        watermark = None
+        if options['include_predictions']:
+            predictions = Prediction.objects.exclude(predicted_cost=None)
+            watermark = predictions.aggregate(count=Count('id'), last_id=Max('id'))
+
+        # Everything that changes the saved artifacts, not just the fit
+        extra = {'predictions': watermark, 'model': options['model'], 'price_grid': not options['no_price_grid']}
+        fingerprint = train_model.training_fingerprint(options['data'], options['cv'], extra, params)
+        fingerprint_path = os.path.splitext(options['output'])[0] + '_fingerprint.json'
+        if not options['force'] and os.path.exists(options['output']) and self._stored(fingerprint_path) == fingerprint:
+            self.stdout.write('Training data, hyperparameters and options unchanged; skipping retrain.')
+            return
+
+        extra_rows = None
+        if predictions is not None:
+            extra_rows = pd.DataFrame.from_records(
+                predictions.values_list('age', 'gender', 'bmi', 'children', 'smoker', 'region', 'predicted_cost'),
+                columns=['age', 'sex', 'bmi', 'children', 'smoker', 'region', 'charges'],
+            )
+            self.stdout.write(f'Adding {len(extra_rows)} stored predictions to the training data')
+
+        data = train_model.load_and_preprocess_data(options['data'], extra_rows, use_cache=not options['no_data_cache'])
+        if options['plots']:
+            train_model.perform_eda(data)
+        X_train, X_test, y_train, y_test = train_model.prepare_model_data(data)
+
+        start = time.time()
+        results_df, models = train_model.train_and_evaluate_models(
+            X_train, X_test, y_train, y_test, n_jobs=options['jobs'], cv=options['cv'], params=params
+        )
+        self.stdout.write(f'Trained {len(models)} models on {len(X_train)} rows in {time.time() - start:.1f}s')
+        self.stdout.write(results_df.sort_values('Cross-Validation', ascending=False).to_string(index=False))
+        if options['plots']:
+            train_model.visualize_results(results_df)
+
+        train_model.save_best_model(
+            models, X_train, options['output'], price_grid=not options['no_price_grid'], name=options['model']
+        )
+        with open(fingerprint_path, 'w') as f:
+            json.dump(fingerprint, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Model saved to {options['output']}"))
+
+    def _stored(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,141 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from mediapp.forms import clean_batch
+from mediapp.ml_models.predict import encode_frame, predict_batch
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS
+
+
+def _pyarrow():
+    # Parquet support is optional; CSV needs nothing beyond pandas
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise CommandError('Parquet input or output needs pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames of at most chunksize rows from a CSV or Parquet file"""
+    if _is_parquet(path):
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file one at a time"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            pa = _pyarrow()
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pa.parquet.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def _score_chunk(offset, frame):
+    # Runs in pool workers too, which load the model once on their first chunk.
+    # Rows get the same range checks as predict() and the batch API, so a
+    # blank or out-of-range value stops the run instead of writing NaN or an
+    # extrapolated price
+    try:
+        X = encode_frame(frame)
+    except ValueError as e:
+        raise ValueError(f'Chunk starting at data row {offset}: {e}')
+    errors = clean_batch(X, first_row=offset)
+    if errors:
+        raise ValueError('Invalid input (data rows count from 0): ' + '; '.join(errors))
+    return predict_batch(X)
+
+
+class Command(BaseCommand):
+    help = (
+        'Price every row of a CSV or Parquet file in the insurance.csv schema, '
+        'streaming it in chunks so memory stays bounded'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='CSV or Parquet file with age, sex, bmi, children, smoker and region')
+        parser.add_argument('output', help='where to write the input rows plus a cost column (.csv or .parquet)')
+        parser.add_argument('--chunksize', type=int, default=100_000, help='rows read and scored at a time')
+        parser.add_argument('--jobs', type=int, default=1, help='worker processes for scoring chunks')
+        parser.add_argument('--column', default='predicted_cost', help='name of the output cost column')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['input']):
+            raise CommandError(f"Input file not found at {options['input']}")
+        if options['chunksize'] < 1 or options['jobs'] < 1:
+            raise CommandError('--chunksize and --jobs must be positive')
+
+        writer = ChunkWriter(options['output'])
+        start = time.perf_counter()
+        try:
+            rows = self._score(options, writer)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            writer.close()
+        elapsed = time.perf_counter() - start
+
+        rate = rows / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s) -> {options['output']}"
+        ))
+
+    def _score(self, options, writer):
+        column = options['column']
+        chunks = read_chunks(options['input'], options['chunksize'])
+        rows = 0
+
+        def emit(frame, costs):
+            nonlocal rows
+            frame[column] = costs
+            writer.write(frame)
+            rows += len(frame)
+
+        if options['jobs'] == 1:
+            for frame in chunks:
+                emit(frame, _score_chunk(rows, frame))
+            return rows
+
+        # Keep only a few chunks in flight and write them back in input order
+        offset = 0
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=options['jobs']) as pool:
+            for frame in chunks:
+                pending.append((frame, pool.submit(_score_chunk, offset, frame)))
+                offset += len(frame)
+                if len(pending) >= 2 * options['jobs']:
+                    frame, future = pending.popleft()
+                    emit(frame, future.result())
+            while pending:
+                frame, future = pending.popleft()
+                emit(frame, future.result())
+        return rows
@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mediapp.ml_models import search, train_model
+
+
+def default_params_path():
+    return os.path.splitext(train_model.MODEL_PATH)[0] + '_params.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Tune candidate model hyperparameters by successive halving over CV '
+        'folds; fold scores are cached on disk so interrupted runs resume'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', default=train_model.DATA_PATH, help='training CSV in the insurance.csv schema')
+        parser.add_argument('--models', nargs='+', default=list(search.SEARCH_SPACES),
+                            choices=list(search.SEARCH_SPACES), help='models to tune')
+        parser.add_argument('--cv', type=int, default=10, help='cross-validation folds of the final rung')
+        parser.add_argument('--min-folds', type=int, default=2, help='folds scored in the first rung')
+        parser.add_argument('--eta', type=int, default=3, help='keep 1/eta of the configurations per rung')
+        parser.add_argument('--jobs', type=int, default=-1, help='worker processes (-1 uses all cores)')
+        parser.add_argument('--cache-dir', default=search.CACHE_DIR, help='where fold scores are cached')
+        parser.add_argument('--output', default=default_params_path(),
+                            help='JSON file of the best params, for retrain --params')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['data']):
+            raise CommandError(f"Training data not found at {options['data']}")
+        if options['eta'] < 2 or not 1 <= options['min_folds'] <= options['cv']:
+            raise CommandError('--eta must be at least 2 and --min-folds between 1 and --cv')
+
+        data = train_model.load_and_preprocess_data(options['data'])
+        X_train, X_test, y_train, y_test = train_model.prepare_model_data(data)
+        models = {name: model for name, model in train_model.candidate_models().items() if name in options['models']}
+
+        start = time.time()
+        results = search.successive_halving(
+            models, X_train, y_train, cv=options['cv'], min_folds=options['min_folds'], eta=options['eta'],
+            n_jobs=options['jobs'], cache_dir=options['cache_dir'], log=self.stdout.write,
+        )
+        self.stdout.write(f'Search finished in {time.time() - start:.1f}s')
+        for name, result in results.items():
+            self.stdout.write(f"{name:<14} R2={result['score']:.4f} {json.dumps(result['params'], sort_keys=True)}")
+
+        best = {name: result['params'] for name, result in results.items()}
+        with open(options['output'], 'w') as f:
+            json.dump(best, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f"Best params saved to {options['output']}"))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from mediapp.outbox import BATCH_SIZE, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails, once or continuously with --loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='messages sent per mail connection')
+        parser.add_argument('--loop', action='store_true', help='keep polling for new messages')
+        parser.add_argument('--interval', type=float, default=5.0, help='seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        # The backend object is reused; each batch opens and closes one session on it
+        connection = get_connection()
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending(options['batch_size'], connection)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+            if sent + failed == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Done: {total_sent} sent, {total_failed} failed'))
@@ -0,0 +1,88 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency bucket upper bounds in seconds, from sub-millisecond cache hits to slow pages
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram per label set, in Prometheus' layout.
+
+    Observing is a bisect and three additions under a lock, so it is cheap
+    enough to run on every request. Values are per process; each server
+    worker exposes its own and Prometheus sums them.
+    """
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        """Return the metric in Prometheus text format lines"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(series):
+            labels = _labels(zip(self.labels, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_labels(zip(self.labels, key), le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def _labels(pairs, **extra):
+    items = [*pairs, *extra.items()]
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+
+def gauge(name, help_text, value, metric_type='gauge', **labels):
+    """Format a single-sample metric in Prometheus text format"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name}{_labels(labels.items())} {value}']
+
+
+request_latency = Histogram(
+    'medicost_request_duration_seconds', 'Time spent handling requests by view, method and status.',
+    ('view', 'method', 'status'),
+)
+stage_latency = Histogram(
+    'medicost_stage_duration_seconds', 'Time spent in instrumented stages such as model calls, ORM writes and rendering.',
+    ('stage',),
+)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Record how long a block or function takes under stage_latency
+    Args:
+        stage: label value, e.g. 'predict' or 'render'
+    Usable as `with timed('render'):` or as a @timed('predict') decorator.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(time.perf_counter() - start, stage)
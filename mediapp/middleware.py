@@ -0,0 +1,41 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import request_latency
+
+
+class MetricsMiddleware:
+    """
+    Time every request and count it by view name, method and status.
+
+    Works under WSGI and ASGI without a thread hop. Requests that do not
+    resolve to a view (404s, static files) are grouped under 'unmatched'
+    so the label set stays bounded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        request_latency.observe(elapsed, view, request.method, str(response.status_code))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediapp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='prediction_user_created_idx'),
+        ),
+    ]
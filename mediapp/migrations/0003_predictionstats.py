@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediapp', '0002_prediction_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_cost', models.FloatField(default=0)),
+                ('min_cost', models.FloatField(blank=True, null=True)),
+                ('max_cost', models.FloatField(blank=True, null=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediapp', '0004_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='base_cost',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='contributions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=12),
+        ),
+    ]
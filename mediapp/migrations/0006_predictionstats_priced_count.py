@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    # Totals for users whose predictions predate PredictionStats; the same
+    # grouped query rebuild_prediction_stats runs
+    Prediction = apps.get_model('mediapp', 'Prediction')
+    PredictionStats = apps.get_model('mediapp', 'PredictionStats')
+    rows = Prediction.objects.values('user').annotate(
+        count=Count('id'),
+        priced_count=Count('predicted_cost'),
+        total_cost=Sum('predicted_cost'),
+        min_cost=Min('predicted_cost'),
+        max_cost=Max('predicted_cost'),
+        last_created_at=Max('created_at'),
+    )
+    PredictionStats.objects.bulk_create(
+        [
+            PredictionStats(
+                user_id=row['user'],
+                count=row['count'],
+                priced_count=row['priced_count'],
+                total_cost=row['total_cost'] or 0,
+                min_cost=row['min_cost'],
+                max_cost=row['max_cost'],
+                last_created_at=row['last_created_at'],
+            )
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['count', 'priced_count', 'total_cost', 'min_cost', 'max_cost', 'last_created_at'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediapp', '0005_prediction_contributions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionstats',
+            name='priced_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
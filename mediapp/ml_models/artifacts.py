@@ -0,0 +1,249 @@
+import contextlib
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .schema import BMI_DECIMALS, ENCODINGS, FEATURES, REGION_CODES, SEX_CODES, SMOKER_CODES
+
+
+def file_checksum(path):
+    """Return the sha256 hex digest of a file, read in 1MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_version(path):
+    """Short checksum used to tie side artifacts to the model they came from"""
+    return file_checksum(path)[:12]
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """
+    Write a file so readers only ever see the old or the complete new one.
+
+    Yields a temporary path next to path. On a clean exit it replaces path
+    (which keeps the old inode alive for processes that still have it
+    mapped); if the block raises, it is removed instead.
+    Args:
+        path: final file path
+    Yields:
+        str: path to write to
+    """
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    try:
+        yield tmp_path
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def coef_table_path(model_path):
+    return os.path.splitext(model_path)[0] + '_coef.json'
+
+
+def pipeline_column_order(model):
+    """
+    Columns of the encoded input in the order the pipeline's scale step emits them
+    Returns:
+        list: FEATURES indices, scaled columns first, or None if the step is not
+        the usual ColumnTransformer
+    """
+    try:
+        scale = model.named_steps['scale']
+        transformers = scale.transformers_
+    except (AttributeError, KeyError):
+        return None
+    order = []
+    for name, transformer, columns in transformers:
+        if transformer != 'drop':
+            order.extend(int(c) for c in columns)
+    if sorted(order) != list(range(len(FEATURES))) or transformers[0][0] != 'scaler':
+        return None
+    return order
+
+
+def export_coef_table(model, model_path, baseline=None, version=None):
+    """
+    Write a linear pipeline's scaler, coefficients and encodings as JSON.
+
+    Floats are written with repr precision, so the table reproduces the
+    fitted parameters exactly.
+    Args:
+        model: fitted Pipeline (encode -> scale -> model) saved at model_path
+        model_path: path of the saved model artifact
+        baseline: mean encoded training row, the reference point for
+            per-feature cost contributions
+        version: model_version() of the artifact, when model_path does not
+            hold it yet
+    Returns:
+        str: path of the table, or None if the model is not linear
+    """
+    try:
+        scale = model.named_steps['scale']
+        estimator = model.named_steps['model']
+        scaler = scale.named_transformers_['scaler']
+    except (AttributeError, KeyError):
+        return None
+    coef = getattr(estimator, 'coef_', None)
+    if coef is None or np.ndim(coef) != 1 or len(coef) != len(FEATURES):
+        return None
+
+    # Column order the ColumnTransformer emits: scaled columns, then the rest
+    order = pipeline_column_order(model)
+    if order is None:
+        return None
+
+    table = {
+        'model_version': version or model_version(model_path),
+        'features': FEATURES,
+        'encodings': ENCODINGS,
+        'order': order,
+        'mean': [float(m) for m in scaler.mean_],
+        'scale': [float(s) for s in scaler.scale_],
+        'intercept': float(estimator.intercept_),
+        'coef': [float(c) for c in coef],
+    }
+    if baseline is not None:
+        table['baseline'] = [float(b) for b in baseline]
+    path = coef_table_path(model_path)
+    with atomic_write(path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(table, f, indent=2)
+    return path
+
+
+def load_coef_table(model_path, version):
+    """
+    Load the coefficient table saved next to a model artifact
+    Args:
+        model_path: path of the model artifact
+        version: model_version() of that artifact
+    Returns:
+        dict: with 'order', 'mean', 'scale', 'intercept', 'coef' and, for tables
+        written with one, 'baseline'; None if there is no table or it belongs
+        to a different model or encoding
+    """
+    try:
+        with open(coef_table_path(model_path)) as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (table.get('model_version') != version or table.get('features') != FEATURES
+            or table.get('encodings') != ENCODINGS):
+        return None
+    for key in ('mean', 'scale', 'coef', 'baseline'):
+        if key in table:
+            table[key] = np.array(table[key], dtype=np.float64)
+    return table
+
+
+def score_coef_table(X, table):
+    """
+    Score an encoded (n, 6) matrix with a coefficient table.
+
+    This is exactly the arithmetic the pipeline's StandardScaler and
+    LinearRegression perform after input validation, so results are
+    bit-for-bit identical to it.
+    """
+    Xt = X[:, table['order']]
+    k = len(table['mean'])
+    Xt[:, :k] -= table['mean']
+    Xt[:, :k] /= table['scale']
+    return Xt @ table['coef'] + table['intercept']
+
+
+# Discrete axes of the price grid, in FEATURES order without bmi. Children
+# beyond the last index fall back to the regular scorer.
+GRID_AXES = [('age', 121), ('sex', 2), ('children', 11), ('smoker', 2), ('region', 4)]
+GRID_BMI_POINTS = (20.0, 40.0)
+
+
+def price_grid_paths(model_path):
+    stem = os.path.splitext(model_path)[0]
+    return stem + '_grid.npy', stem + '_grid.json'
+
+
+def export_price_grid(model, model_path, bmi_points=GRID_BMI_POINTS, version=None):
+    """
+    Precompute intercept and BMI slope of the price in every discrete cell.
+
+    Only models whose price is affine in BMI within a cell (i.e. linear
+    models) get a grid; the cells are priced by the model itself at two BMI
+    values and checked against a third.
+    Args:
+        model: fitted Pipeline saved at model_path
+        model_path: path of the saved model artifact
+        version: model_version() of the artifact, when model_path does not
+            hold it yet
+    Returns:
+        str: path of the .npy grid, or None if the model is not affine in BMI
+    """
+    sizes = [size for _, size in GRID_AXES]
+    cells = np.stack(np.meshgrid(*[np.arange(size) for size in sizes], indexing='ij'), axis=-1).reshape(-1, len(sizes))
+    bmi = FEATURES.index('bmi')
+
+    def price_at(value):
+        X = np.insert(cells.astype(np.float64), bmi, value, axis=1)
+        return model.predict(X)
+
+    (b0, b1) = bmi_points
+    p0, p1, p_mid = price_at(b0), price_at(b1), price_at((b0 + b1) / 2)
+    if not np.allclose(p_mid, (p0 + p1) / 2, rtol=1e-9, atol=1e-6):
+        return None
+
+    slope = (p1 - p0) / (b1 - b0)
+    grid = np.stack([p0 - slope * b0, slope], axis=-1).reshape(sizes + [2])
+
+    npy_path, meta_path = price_grid_paths(model_path)
+    with atomic_write(npy_path) as tmp_path, open(tmp_path, 'wb') as f:
+        np.save(f, grid)
+    meta = {'model_version': version or model_version(model_path), 'axes': GRID_AXES, 'encodings': ENCODINGS}
+    with atomic_write(meta_path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return npy_path
+
+
+def load_price_grid(model_path, version):
+    """
+    Memory-map the price grid saved next to a model artifact
+    Returns:
+        np.ndarray: read-only (121, 2, 11, 2, 4, 2) grid of [base, slope], or
+        None if there is no grid for this model version
+    """
+    npy_path, meta_path = price_grid_paths(model_path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta.get('model_version') != version or meta.get('encodings') != ENCODINGS
+                or [tuple(axis) for axis in meta.get('axes', [])] != GRID_AXES):
+            return None
+        return np.load(npy_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+
+def score_price_grid(grid, age, sex, bmi, children, smoker, region):
+    """
+    Price one applicant from the grid: one cell lookup and a multiply-add
+    Args:
+        grid: array from load_price_grid
+        age, children: int
+        sex, smoker, region: lowercase labels
+        bmi: float
+    Returns:
+        float: predicted cost, or None if the inputs fall outside the grid
+    """
+    if not (0 <= age < GRID_AXES[0][1] and 0 <= children < GRID_AXES[2][1]):
+        return None
+    try:
+        base, slope = grid[age, SEX_CODES[sex], children, SMOKER_CODES[smoker], REGION_CODES[region]]
+    except KeyError:
+        return None
+    return float(base + slope * bmi)
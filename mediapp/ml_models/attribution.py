@@ -0,0 +1,58 @@
+import numpy as np
+
+from .schema import FEATURES
+from .trees import tree_path_contributions
+
+
+def linear_contributions(X, table):
+    """
+    Exact per-feature contributions of a linear model from its coefficient table.
+
+    Each feature contributes coef * (scaled value - scaled baseline value),
+    so the base cost plus a row's contributions is that row's price.
+    Args:
+        X: encoded (n, 6) matrix
+        table: coefficient table from load_coef_table
+    Returns:
+        (float, np.ndarray): cost of the baseline applicant and (n, 6)
+        contributions in FEATURES order, or None if the table has no baseline
+    """
+    if 'baseline' not in table:
+        return None
+    order, k = table['order'], len(table['mean'])
+
+    def transform(M):
+        Z = M[:, order]
+        Z[:, :k] -= table['mean']
+        Z[:, :k] /= table['scale']
+        return Z
+
+    Z = transform(np.asarray(X, dtype=np.float64))
+    Zb = transform(table['baseline'][None, :])
+    contributions = np.empty_like(Z)
+    contributions[:, order] = (Z - Zb) * table['coef']
+    return float(Zb[0] @ table['coef'] + table['intercept']), contributions
+
+
+def feature_contributions(X, loaded):
+    """
+    Per-feature cost contributions for encoded rows from a served side table.
+
+    Linear models are split exactly from their coefficient table. Tree
+    ensembles get approximate path attribution from their node array (see
+    tree_path_contributions): it adds up to the price but is not the
+    Shapley value TreeSHAP would give. Either way the pipeline that serving
+    avoids is never unpickled.
+    Args:
+        X: encoded (n, 6) matrix, n >= 1
+        loaded: LoadedModel that priced the rows
+    Returns:
+        (float, np.ndarray, str): base cost, (n, 6) contributions and the
+        method ('exact' or 'path'), or None when the model has neither table
+    """
+    if loaded.coef_table is not None:
+        result = linear_contributions(X, loaded.coef_table)
+        return None if result is None else (*result, 'exact')
+    if loaded.tree_ensemble is not None:
+        return (*tree_path_contributions(X, loaded.tree_ensemble), 'path')
+    return None
@@ -0,0 +1,130 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into one vectorized call.
+
+    Callers submit an encoded (1, 6) row with the model that should price
+    it and wait on a Future. A background thread takes the first waiting
+    row, keeps collecting for up to max_wait_ms or until max_rows are
+    queued, scores the rows of each model with a single score_fn(X, model)
+    call and resolves every Future, so a reload mid-batch never prices a
+    row with a different model than its caller records. If scoring fails
+    or returns the wrong number of rows, every Future of that group gets
+    the error. Concurrency only comes from
+    threaded or async servers; with one request per process each batch has
+    one row and the wait is just added latency.
+    """
+
+    def __init__(self, score_fn, max_wait_ms=2.0, max_rows=64):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._reset_stats()
+
+    def submit(self, row, model=None):
+        """
+        Queue one encoded row for scoring
+        Args:
+            row: encoded (1, 6) array
+            model: passed to score_fn; rows are only batched with rows for the same model
+        Returns:
+            Future: resolves to the row's predicted cost
+        """
+        future = Future()
+        self._ensure_worker().put((row, model, future, time.perf_counter()))
+        return future
+
+    def predict(self, row, model=None):
+        """Score one encoded row, blocking until its batch has run"""
+        return self.submit(row, model).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+                'batch_size_buckets': dict(zip(BATCH_SIZE_BUCKETS + ('+Inf',), self.size_counts)),
+                'score_seconds_total': self.score_seconds,
+                'wait_seconds_total': self.wait_seconds,
+            }
+
+    def _reset_stats(self):
+        self.batches = 0
+        self.rows = 0
+        self.size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.score_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    thread = threading.Thread(target=self._run, args=(self._queue,), name='micro-batcher', daemon=True)
+                    thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _collect(self, pending):
+        batch = [pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            groups = {}
+            for item in self._collect(pending):
+                groups.setdefault(id(item[1]), []).append(item)
+            for group in groups.values():
+                self._score(group)
+
+    def _score(self, group):
+        rows, models, futures, submitted = zip(*group)
+        start = time.perf_counter()
+        try:
+            costs = self.score_fn(np.vstack(rows), models[0])
+            if len(costs) != len(futures):
+                raise ValueError(f'score_fn returned {len(costs)} costs for {len(futures)} rows')
+            for future, cost in zip(futures, costs):
+                future.set_result(float(cost))
+        except BaseException as e:
+            # No caller may be left waiting, whatever went wrong
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._record(len(group), time.perf_counter() - start, sum(start - t for t in submitted))
+
+    def _record(self, size, score_seconds, wait_seconds):
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            self.score_seconds += score_seconds
+            self.wait_seconds += wait_seconds
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+            self.size_counts[bucket] += 1
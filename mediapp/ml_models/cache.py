@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Default number of distinct inputs remembered per process
+CACHE_SIZE = 10000
+
+
+class PredictionCache:
+    """
+    Bounded LRU memo of predicted costs keyed on normalized inputs.
+
+    Entries belong to one model version; the first lookup with a different
+    version drops everything, so a hot-reloaded model never serves stale prices.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, version, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+prediction_cache = PredictionCache(getattr(settings, 'PREDICTION_CACHE_SIZE', CACHE_SIZE))
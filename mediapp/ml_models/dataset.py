@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from .artifacts import atomic_write, file_checksum
+from .schema import ENCODINGS, FEATURES
+
+logger = logging.getLogger(__name__)
+
+# In-memory dtypes of the encoded training frame. Category codes, ages and
+# child counts fit in int8. The floats stay float64: insurance.csv has BMIs
+# with three decimals and charges with up to ten significant digits, and
+# float32 would perturb both enough to change the fitted coefficients.
+DTYPES = {
+    'age': np.int8,
+    'sex': np.int8,
+    'bmi': np.float64,
+    'children': np.int8,
+    'smoker': np.int8,
+    'region': np.int8,
+    'charges': np.float64,
+}
+
+# Labels in code order, so a categorical's codes are the serving codes
+CATEGORIES = {
+    name: pd.CategoricalDtype([label for label, _ in sorted(codes.items(), key=lambda item: item[1])])
+    for name, codes in ENCODINGS.items()
+}
+
+# Rows parsed at a time: peak memory is the encoded columns plus one raw
+# chunk and its encoding
+CHUNK_ROWS = 250_000
+
+# Bump when the encoded layout changes so old caches are not reused
+CACHE_FORMAT = 1
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.environ.get('MEDICOST_DATA_CACHE', os.path.join(BASE_DIR, '.cache', 'datasets'))
+
+
+def encode_frame(frame):
+    """
+    Encode a raw insurance.csv-schema frame to the typed training layout
+    Args:
+        frame: DataFrame with FEATURES and 'charges'; categorical columns as
+            labels (strings or pandas categories)
+    Returns:
+        pd.DataFrame: numeric columns with the dtypes in DTYPES
+    Raises:
+        ValueError: for unknown categories or values that do not fit their dtype
+    """
+    encoded = {}
+    for name, dtype in DTYPES.items():
+        column = frame[name]
+        if name in CATEGORIES:
+            codes = column.astype(CATEGORIES[name]).cat.codes
+            unknown = codes < 0
+            if unknown.any():
+                raise ValueError(f"Unknown {name} '{column[unknown].iloc[0]}'")
+            encoded[name] = codes.to_numpy(dtype)
+        else:
+            values = column.to_numpy()
+            converted = values.astype(dtype)
+            if np.issubdtype(dtype, np.integer) and not np.array_equal(converted, values):
+                raise ValueError(f"{name} values must be whole numbers between {np.iinfo(dtype).min} and {np.iinfo(dtype).max}")
+            encoded[name] = converted
+    return pd.DataFrame(encoded, index=frame.index)
+
+
+def _count_rows(path):
+    # Upper bound on the data rows: lines after the header (blank lines and
+    # quoted line breaks only make it larger)
+    lines = 1
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+    return max(lines - 1, 0)
+
+
+def read_csv(path, chunk_rows=CHUNK_ROWS):
+    """
+    Parse and encode a training CSV chunk by chunk.
+
+    A first pass counts the lines, so each column is allocated once at its
+    final dtype and filled in place; no list of chunks is concatenated.
+    """
+    read_dtypes = {name: CATEGORIES.get(name, dtype) for name, dtype in DTYPES.items()}
+    # Integers are parsed wide and narrowed by encode_frame, which checks the range
+    for name in ('age', 'children'):
+        read_dtypes[name] = np.int64
+    capacity = _count_rows(path)
+    columns = {name: np.empty(capacity, dtype) for name, dtype in DTYPES.items()}
+    rows = 0
+    for chunk in pd.read_csv(path, usecols=list(DTYPES), dtype=read_dtypes, chunksize=chunk_rows):
+        encoded = encode_frame(chunk)
+        for name, column in columns.items():
+            column[rows:rows + len(encoded)] = encoded[name].to_numpy()
+        rows += len(encoded)
+    return pd.DataFrame({name: column[:rows] for name, column in columns.items()}, copy=False)
+
+
+def cache_path(path, checksum=None, cache_dir=None):
+    """Cache file for a CSV, keyed by its content and the encoded layout"""
+    checksum = checksum or file_checksum(path)
+    layout = json.dumps([CACHE_FORMAT, ENCODINGS, {k: np.dtype(v).str for k, v in DTYPES.items()}], sort_keys=True)
+    key = hashlib.sha256(f'{checksum}:{layout}'.encode()).hexdigest()[:20]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    suffix = '.feather' if _has_pyarrow() else '.pkl'
+    return os.path.join(cache_dir or CACHE_DIR, f'{stem}-{key}{suffix}')
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_cache(data, path):
+    # Feather when pyarrow is installed, else pandas' pickle; both keep dtypes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as tmp_path:
+        if path.endswith('.feather'):
+            data.to_feather(tmp_path)
+        else:
+            data.to_pickle(tmp_path)
+
+
+def _read_cache(path):
+    if path.endswith('.feather'):
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def load_dataset(path, use_cache=True, cache_dir=None):
+    """
+    Load a training CSV as a typed, encoded frame, reusing a binary cache.
+
+    The first load parses the CSV in chunks and writes the encoded frame
+    to the cache; later loads of an unchanged file read the cache instead.
+    Args:
+        path: CSV in the insurance.csv schema
+        use_cache: read and write the cache
+        cache_dir: where cache files live, defaults to CACHE_DIR
+    Returns:
+        pd.DataFrame: FEATURES and 'charges' with the dtypes in DTYPES
+    """
+    if not use_cache:
+        return read_csv(path)
+    cached = cache_path(path, cache_dir=cache_dir)
+    if os.path.exists(cached):
+        try:
+            return _read_cache(cached)
+        except Exception:
+            logger.warning('Ignoring unreadable dataset cache %s', cached, exc_info=True)
+    data = read_csv(path)
+    try:
+        _write_cache(data, cached)
+    except OSError:
+        logger.warning('Could not write dataset cache %s', cached, exc_info=True)
+    return data
+
+
+def training_matrix(data):
+    """The float64 feature matrix the models are fitted on, in FEATURES order"""
+    return data[FEATURES].astype(np.float64)
@@ -0,0 +1,83 @@
+import numpy as np
+
+from .schema import FEATURES, ENCODINGS, BMI_DECIMALS
+
+# Numeric features that only take whole values; fractions are rejected, not truncated
+WHOLE_FEATURES = ('age', 'children')
+
+# Sorted labels and their codes per categorical feature, for searchsorted lookups
+_LOOKUPS = {
+    name: (np.array(sorted(codes)), np.array([codes[k] for k in sorted(codes)], dtype=np.float64))
+    for name, codes in ENCODINGS.items()
+}
+
+
+def quantize_bmi(bmi):
+    """
+    Round BMI to BMI_DECIMALS. Every path (predict(), the batch API,
+    score_file, the form) rounds through here, so the same input always
+    gets the same price
+    Args:
+        bmi: float or array of floats
+    Returns:
+        float, or np.ndarray for array input
+    """
+    rounded = np.round(np.asarray(bmi, dtype=np.float64), BMI_DECIMALS)
+    return float(rounded) if rounded.ndim == 0 else rounded
+
+
+def _encode_column(values, name):
+    # Map a column of category labels to their integer codes in one pass
+    keys, codes = _LOOKUPS[name]
+    labels = np.char.lower(np.asarray(values, dtype=str))
+    positions = np.searchsorted(keys, labels).clip(0, len(keys) - 1)
+    unknown = keys[positions] != labels
+    if unknown.any():
+        row = int(np.flatnonzero(unknown)[0])
+        raise ValueError(f"Row {row}: unknown {name} '{values[row]}'")
+    return codes[positions]
+
+
+def encode_columns(columns):
+    """
+    Encode raw feature columns into the numeric model input matrix
+    Args:
+        columns: dict mapping each name in FEATURES to a sequence of values
+    Returns:
+        np.ndarray: (n, 6) float64 array in FEATURES order
+    Raises:
+        ValueError: for non-numeric values, fractional ages or children, or
+        unknown categories
+    """
+    n = len(columns[FEATURES[0]])
+    X = np.empty((n, len(FEATURES)), dtype=np.float64)
+    for i, name in enumerate(FEATURES):
+        if name in ENCODINGS:
+            X[:, i] = _encode_column(columns[name], name)
+            continue
+        try:
+            X[:, i] = np.asarray(columns[name], dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Field '{name}' must be numeric")
+        if name in WHOLE_FEATURES:
+            fractional = X[:, i] != np.floor(X[:, i])
+            if fractional.any():
+                raise ValueError(f"Row {int(np.flatnonzero(fractional)[0])}: {name} must be a whole number")
+    bmi = FEATURES.index('bmi')
+    X[:, bmi] = quantize_bmi(X[:, bmi])
+    return X
+
+
+def encode_records(records):
+    """
+    Encode a list of applicant dicts into the numeric model input matrix
+    Raises:
+        ValueError: if a row is missing a field or has an invalid value
+    """
+    try:
+        columns = {name: [record[name] for record in records] for name in FEATURES}
+    except KeyError as e:
+        raise ValueError(f"Missing field {e}")
+    except TypeError:
+        raise ValueError("Each applicant must be a JSON object")
+    return encode_columns(columns)
@@ -1,12 +1,21 @@
-import joblib
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import numpy as np
-import os
 from django.conf import settings
 
-# Load the model
-model_path = os.path.join(settings.BASE_DIR, 'mediapp', 'ml_models', 'insurance_model.pkl')
-model = joblib.load(model_path)
+from ..metrics import timed
+from .artifacts import FEATURES, score_coef_table, score_price_grid
+from .attribution import feature_contributions
+from .batching import MicroBatcher
+from . import whatif
+from .cache import PredictionCache, prediction_cache
+from .encoding import encode_columns, encode_records, quantize_bmi
+from .registry import registry
+from .trees import score_tree_ensemble
 
+@timed('predict')
 def predict(age, sex, bmi, children, smoker, region):
     """
     Make insurance cost prediction
@@ -19,26 +28,187 @@ def predict(age, sex, bmi, children, smoker, region):
         region: str (one of ['northeast', 'northwest', 'southeast', 'southwest'])
     Returns:
         float: predicted cost
+    Raises:
+        ValueError: for a fractional age or children, or an unknown sex,
+        smoker or region value
+    """
+    # Identical normalized inputs are priced once per model version
+    key = _normalize(age, sex, bmi, children, smoker, region)
+    loaded = registry.get()
+    cost = prediction_cache.get(loaded.version, key)
+    if cost is not None:
+        return cost
+
+    # Linear models ship a per-cell price grid: one lookup and a multiply-add
+    cost = None
+    if loaded.price_grid is not None:
+        cost = score_price_grid(loaded.price_grid, *key)
+    if cost is None:
+        X = encode_batch([dict(zip(FEATURES, key))])
+        if micro_batcher is not None:
+            cost = micro_batcher.predict(X, loaded)
+        else:
+            cost = float(_score(X, loaded)[0])
+    prediction_cache.set(loaded.version, key, cost)
+    return cost
+
+def _normalize(age, sex, bmi, children, smoker, region):
+    # Canonical form of one applicant's inputs, in FEATURES order. Whole
+    # fields are checked rather than truncated, so 40.9 never shares 40's entry
+    return (_whole(age, 'age'), str(sex).lower(), quantize_bmi(bmi), _whole(children, 'children'),
+            str(smoker).lower(), str(region).lower())
+
+def _whole(value, name):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f'{name} must be a whole number')
+    return int(number)
+
+@timed('what_if')
+def what_if(prediction_id, age, sex, bmi, children, smoker, region):
     """
-    # Convert categorical features
-    sex_encoded = 0 if sex == 'male' else 1
-    smoker_encoded = 1 if smoker == 'yes' else 0
-    region_mapping = {
-        'northwest': 0,
-        'northeast': 1,
-        'southeast': 2,
-        'southwest': 3
-    }
-    region_encoded = region_mapping.get(region.lower(), 0)
-    
-    # Prepare input array
-    input_data = np.array([
-        age,
-        sex_encoded,
-        bmi,
-        children,
-        smoker_encoded,
-        region_encoded
-    ]).reshape(1, -1)
-    
-    return float(model.predict(input_data)[0])
\ No newline at end of file
+    Price counterfactual variants of a stored prediction in one model call
+    Args:
+        prediction_id: id of the Prediction the inputs come from
+        age, sex, bmi, children, smoker, region: as for predict()
+    Returns:
+        dict: see whatif.what_if; cached per prediction and model version
+    """
+    key = (prediction_id, _normalize(age, sex, bmi, children, smoker, region))
+    loaded = registry.get()
+    result = whatif_cache.get(loaded.version, key)
+    if result is None:
+        result = whatif.what_if(dict(zip(FEATURES, key[1])), partial(_score, loaded=loaded))
+        whatif_cache.set(loaded.version, key, result)
+    return result
+
+_executor = None
+
+def _inference_executor():
+    # Bounded pool so concurrent async requests cannot spawn unlimited threads
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'INFERENCE_THREADS', 4),
+            thread_name_prefix='inference',
+        )
+    return _executor
+
+async def run_in_inference_pool(func, *args, **kwargs):
+    """
+    Run a sync model call (scoring, explaining, what-if pricing) from async
+    code in the bounded inference pool, so the event loop never blocks on it
+    and at most INFERENCE_THREADS such calls run at once
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor(), partial(func, *args, **kwargs))
+
+async def apredict(**features):
+    """predict() for async views, in the inference thread pool"""
+    return await run_in_inference_pool(predict, **features)
+
+def encode_batch(records):
+    """
+    Encode many applicants into a single model input matrix
+    Args:
+        records: list of dicts with the keys in FEATURES
+    Returns:
+        np.ndarray: (n, 6) float array in FEATURES order
+    Raises:
+        ValueError: if a row is missing a field or has an unknown category
+    """
+    return encode_records(records)
+
+@timed('predict_batch')
+def predict_batch(X, loaded=None):
+    """
+    Make insurance cost predictions for many applicants with one model call
+    Args:
+        X: (n, 6) array from encode_batch
+        loaded: LoadedModel to score with, defaults to the current one
+    Returns:
+        np.ndarray: predicted cost per row
+    """
+    if len(X) == 0:
+        return np.empty(0)
+    return _score(X, loaded)
+
+def encode_frame(frame):
+    """
+    Encode a DataFrame in the insurance.csv schema into the model input matrix
+    Args:
+        frame: DataFrame with at least the columns in FEATURES
+    Returns:
+        np.ndarray: (n, 6) float array in FEATURES order
+    Raises:
+        ValueError: if a column is missing or a row has an invalid value
+    """
+    missing = [name for name in FEATURES if name not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return encode_columns({name: frame[name].to_numpy() for name in FEATURES})
+
+def score_frame(frame):
+    """
+    Price every row of a DataFrame in the insurance.csv schema
+    Args:
+        frame: DataFrame with at least the columns in FEATURES
+    Returns:
+        np.ndarray: predicted cost per row
+    Raises:
+        ValueError: if a column is missing or a row has an invalid value
+    """
+    return predict_batch(encode_frame(frame))
+
+@timed('explain_batch')
+def explain_batch(X):
+    """
+    Split each row's predicted cost into per-feature contributions
+    Args:
+        X: (n, 6) array from encode_batch
+    Returns:
+        dict: model_version, base_cost (price of the average training
+        applicant), contributions, an (n, 6) array in FEATURES order that
+        adds up to cost - base_cost, and method ('exact' for linear models,
+        'path' for approximate tree path attribution); None if the model has
+        no fast explanation
+    """
+    if len(X) == 0:
+        return None
+    loaded = registry.get()
+    result = feature_contributions(X, loaded)
+    if result is None:
+        return None
+    base_cost, contributions, method = result
+    return {'model_version': loaded.version, 'base_cost': base_cost, 'contributions': contributions, 'method': method}
+
+def explain(age, sex, bmi, children, smoker, region):
+    """explain_batch() for one applicant, with the arguments of predict()"""
+    key = _normalize(age, sex, bmi, children, smoker, region)
+    return explain_batch(encode_batch([dict(zip(FEATURES, key))]))
+
+def _score(X, loaded=None):
+    # X is already encoded, so only the pipeline's scaling and estimator run.
+    # Linear models with an exported coefficient table skip sklearn's
+    # per-call input validation; the arithmetic is identical. Tree ensembles
+    # exported as flat node arrays are walked with numpy alone for small batches
+    loaded = loaded or registry.get()
+    if loaded.coef_table is not None:
+        return score_coef_table(X, loaded.coef_table)
+    if loaded.tree_ensemble is not None and len(X) <= TREE_ENSEMBLE_MAX_ROWS:
+        return score_tree_ensemble(X, loaded.tree_ensemble)
+    return loaded.model[1:].predict(X)
+
+TREE_ENSEMBLE_MAX_ROWS = getattr(settings, 'TREE_ENSEMBLE_MAX_ROWS', 128)
+
+# What-if results are small dicts, so a few hundred cover every open result page
+whatif_cache = PredictionCache(getattr(settings, 'WHATIF_CACHE_SIZE', 500))
+
+# Concurrent predict() calls share one vectorized model call when enabled
+micro_batcher = None
+if getattr(settings, 'MICRO_BATCH_ENABLED', False):
+    micro_batcher = MicroBatcher(
+        predict_batch,
+        max_wait_ms=getattr(settings, 'MICRO_BATCH_WAIT_MS', 2.0),
+        max_rows=getattr(settings, 'MICRO_BATCH_MAX_ROWS', 64),
+    )
@@ -0,0 +1,47 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .artifacts import FEATURES
+from .encoding import encode_columns
+
+# Columns of the encoded matrix that are standardized before the estimator
+SCALED_COLUMNS = [FEATURES.index('age'), FEATURES.index('bmi')]
+
+
+class CategoryEncoder(BaseEstimator, TransformerMixin):
+    """
+    First pipeline step: turn raw (n, 6) feature rows into numeric codes.
+
+    Unknown categories raise instead of falling back to a default code.
+    Input that is already numeric is passed through unchanged.
+    """
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        if X.dtype.kind in 'biuf':
+            return X.astype(np.float64, copy=False)
+        return encode_columns({name: X[:, i] for i, name in enumerate(FEATURES)})
+
+
+def build_pipeline(estimator):
+    """
+    Wrap an estimator with the encoding and scaling used in training
+    Args:
+        estimator: unfitted sklearn regressor
+    Returns:
+        Pipeline: encode -> scale age and bmi -> estimator
+    """
+    return Pipeline([
+        ('encode', CategoryEncoder()),
+        ('scale', ColumnTransformer(
+            [('scaler', StandardScaler(), SCALED_COLUMNS)],
+            remainder='passthrough',
+        )),
+        ('model', estimator),
+    ])
@@ -0,0 +1,206 @@
+import gc
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .artifacts import load_coef_table, load_price_grid, model_version
+from .trees import load_tree_ensemble
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) get() looks at the artifact on disk for a newer version
+CHECK_INTERVAL = 5.0
+
+# Artifacts are loaded with numpy arrays memory-mapped read-only, so
+# processes serving the same file share its pages through the OS page cache
+MMAP_MODE = 'r'
+
+
+def default_model_path():
+    return getattr(
+        settings, 'MODEL_PATH',
+        os.path.join(settings.BASE_DIR, 'mediapp', 'ml_models', 'insurance_model.pkl')
+    )
+
+
+class StaleModelError(RuntimeError):
+    """The artifact on disk no longer matches the LoadedModel reading it"""
+
+
+class LoadedModel:
+    """
+    A model together with the metadata and side tables of its artifact.
+
+    When a coefficient table, price grid or flattened tree ensemble can
+    serve predictions, the pipeline itself is only unpickled the first time
+    .model is used, so quote requests never import sklearn. That lazy load
+    checks it read the artifact this object's version and side tables came
+    from; if a newer artifact was swapped in meanwhile it raises
+    StaleModelError instead, and the registry picks the new version up on
+    its next check.
+    """
+
+    def __init__(self, path, version, mtime, mmap_mode=None, coef_table=None, price_grid=None, tree_ensemble=None):
+        self.path = path
+        self.version = version
+        self.mtime = mtime
+        self.mmap_mode = mmap_mode
+        self.coef_table = coef_table
+        self.price_grid = price_grid
+        self.tree_ensemble = tree_ensemble
+        self.load_seconds = 0.0
+        self.loaded_at = time.time()
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import joblib
+
+                    start = time.perf_counter()
+                    inode = os.stat(self.path).st_ino
+                    model = joblib.load(self.path, mmap_mode=self.mmap_mode)
+                    # Same file throughout the load, and the version we were built for
+                    if os.stat(self.path).st_ino != inode or model_version(self.path) != self.version:
+                        raise StaleModelError(f'{self.path} changed since version {self.version} was loaded')
+                    if getattr(model, 'steps', [(None,)])[0][0] != 'encode':
+                        raise TypeError(f'{self.path} is not a preprocessing Pipeline; retrain it with train_model')
+                    self.load_seconds += time.perf_counter() - start
+                    self._model = model
+        return self._model
+
+    @property
+    def model_loaded(self):
+        return self._model is not None
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the serving model.
+
+    The artifact is loaded on first use and shared by every caller. get()
+    periodically stats the file; when its mtime changes and its checksum
+    differs, the new artifact is loaded and swapped in with a single
+    reference assignment, so in-flight requests keep the model they started with.
+    """
+
+    def __init__(self, path=None, check_interval=CHECK_INTERVAL, mmap_mode=MMAP_MODE):
+        self._path = path
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self._current = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path or default_model_path()
+
+    def get(self):
+        """Return the current LoadedModel, loading or reloading it if needed"""
+        current = self._current
+        if current is None or time.monotonic() - self._last_check >= self.check_interval:
+            current = self._refresh()
+        return current
+
+    def preload(self):
+        """
+        Load the model now and freeze the heap for copy-on-write sharing.
+
+        Call this in the server master before it forks workers (gunicorn
+        --preload imports medicost.wsgi in the master). Workers then start
+        with the model already in memory and share its pages instead of
+        each loading a private copy; gc.freeze() keeps the collector from
+        writing to those objects and un-sharing them. Only what serving
+        needs is loaded: with a coefficient table, price grid or tree
+        ensemble the pipeline (and sklearn) stays on disk until something
+        asks for it.
+        """
+        try:
+            loaded = self.get()
+        except FileNotFoundError as e:
+            logger.warning('%s; workers will load the model on first use', e)
+            return None
+        gc.freeze()
+        return loaded
+
+    def reload(self):
+        """Force the artifact to be read again on the next get()"""
+        with self._lock:
+            self._current = None
+
+    def info(self):
+        """Return version and cold-start cost of the loaded model, if any"""
+        current = self._current
+        if current is None:
+            return {'loaded': False, 'path': self.path}
+        return {
+            'loaded': True,
+            'path': current.path,
+            'version': current.version,
+            'load_seconds': current.load_seconds,
+            'pipeline_loaded': current.model_loaded,
+            'coef_table': current.coef_table is not None,
+            'price_grid': current.price_grid is not None,
+            'tree_ensemble': current.tree_ensemble is not None,
+            'loaded_at': current.loaded_at,
+        }
+
+    def _refresh(self):
+        with self._lock:
+            self._last_check = time.monotonic()
+            current = self._current
+            path = self.path
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                if current is None:
+                    raise FileNotFoundError(f'Model artifact not found at {path}')
+                logger.warning('Model artifact %s disappeared, keeping version %s', path, current.version)
+                return current
+
+            if current is not None and current.path == path and current.mtime == mtime:
+                return current
+
+            version = model_version(path)
+            if current is not None and current.version == version:
+                current.mtime = mtime
+                return current
+
+            try:
+                self._current = self._load(path, version, mtime)
+            except Exception:
+                if current is None:
+                    raise
+                logger.exception('Failed to load model %s, keeping version %s', path, current.version)
+            return self._current
+
+    def _load(self, path, version, mtime):
+        start = time.perf_counter()
+        loaded = LoadedModel(
+            path, version, mtime, self.mmap_mode,
+            coef_table=load_coef_table(path, version),
+            price_grid=load_price_grid(path, version),
+            tree_ensemble=load_tree_ensemble(path, version),
+        )
+        loaded.load_seconds = time.perf_counter() - start
+        # Without a side table every prediction needs the pipeline, so load
+        # it now; a broken artifact then fails here and the old one is kept
+        if loaded.coef_table is None and loaded.price_grid is None and loaded.tree_ensemble is None:
+            loaded.model
+        logger.info('Loaded model %s version %s in %.3fs', path, version, loaded.load_seconds)
+        return loaded
+
+
+registry = ModelRegistry(mmap_mode=getattr(settings, 'MODEL_MMAP_MODE', MMAP_MODE))
+
+
+def get_model():
+    """Return the shared serving estimator"""
+    return registry.get().model
@@ -0,0 +1,10 @@
+# Feature order and categorical encodings shared by training and serving.
+# Kept free of numpy and joblib so forms and views can import it at startup.
+FEATURES = ['age', 'sex', 'bmi', 'children', 'smoker', 'region']
+SEX_CODES = {'male': 0, 'female': 1}
+SMOKER_CODES = {'no': 0, 'yes': 1}
+REGION_CODES = {'northwest': 0, 'northeast': 1, 'southeast': 2, 'southwest': 3}
+ENCODINGS = {'sex': SEX_CODES, 'smoker': SMOKER_CODES, 'region': REGION_CODES}
+
+# BMI is accepted to this many decimals; finer input is rounded before scoring
+BMI_DECIMALS = 2
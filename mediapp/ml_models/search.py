@@ -0,0 +1,183 @@
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid
+
+from .dataset import BASE_DIR
+
+# Candidate hyperparameters per model; the current defaults are included
+SEARCH_SPACES = {
+    'Ridge': {'alpha': [0.1, 1, 3, 10, 20, 30, 100]},
+    'SVR': {'C': [1, 10, 100, 1000], 'gamma': [0.01, 0.1, 1]},
+    'RandomForest': {'n_estimators': [200, 600, 1200], 'max_depth': [10, 50], 'min_samples_leaf': [4, 12]},
+    'XGBoost': {'n_estimators': [100, 300], 'max_depth': [3, 6], 'learning_rate': [0.05, 0.1, 0.3]},
+}
+
+# Estimators with a random_state are seeded so that scores cached by one
+# run are comparable with fits made by a resumed one
+RANDOM_STATE = 42
+
+CACHE_DIR = os.environ.get('MEDICOST_SEARCH_CACHE', os.path.join(BASE_DIR, '.cache', 'search'))
+
+
+def data_hash(X, y):
+    """Content hash of a training split, so cached scores never outlive their data"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(np.asarray(X, dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def config_key(estimator, params):
+    """
+    Hash of every hyperparameter a fit will use, the searched ones and the
+    fixed defaults candidate_models() sets, so changing either never
+    reuses a stale score
+    """
+    full = clone(estimator).set_params(**params).get_params()
+    text = json.dumps([type(estimator).__name__, full], sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()[:20]
+
+
+class FoldScoreCache:
+    """
+    Append-only JSON-lines file of CV fold scores for one training split.
+
+    Scores are keyed by the estimator's full configuration (config_key),
+    the fold scheme and the fold index. Every finished score is written and
+    flushed as soon as it arrives, so an interrupted search loses at most
+    the fits that were still running. A torn last line is skipped on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._scores = {}
+        self._torn = False
+        try:
+            with open(path) as f:
+                for line in f:
+                    self._torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'config' in entry:
+                        self._scores[(entry['config'], entry['folds'], entry['fold'])] = entry['score']
+        except OSError:
+            pass
+
+    def get(self, config, folds, fold):
+        return self._scores.get((config, folds, fold))
+
+    def put(self, config, folds, fold, score, seconds, **info):
+        # info (model name, searched params) is kept for people reading the file
+        self._scores[(config, folds, fold)] = score
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            if self._torn:
+                f.write('\n')
+                self._torn = False
+            f.write(json.dumps({**info, 'config': config, 'folds': folds, 'fold': fold,
+                                'score': score, 'seconds': seconds}) + '\n')
+
+    def __len__(self):
+        return len(self._scores)
+
+
+def _seeded(estimator):
+    # A copy with random_state fixed, unless the candidate already sets one
+    estimator = clone(estimator)
+    if estimator.get_params().get('random_state', RANDOM_STATE) is None:
+        estimator.set_params(random_state=RANDOM_STATE)
+    return estimator
+
+
+def _score_fold(name, estimator, params, fold_index, fold, X, y):
+    # Runs in a pool worker: one fit on a fold's training rows, R2 on the rest
+    from .train_model import _run_task
+    result = _run_task(name, clone(estimator).set_params(**params), fold, X, y, None)
+    return name, params, fold_index, result['score'], result['end'] - result['start']
+
+
+def successive_halving(models, X, y, cv=10, min_folds=2, eta=3, n_jobs=-1, cache_dir=None, log=print):
+    """
+    Tune every model's hyperparameters by successive halving over CV folds.
+
+    All configurations are first scored on min_folds folds; the best 1/eta
+    of each model's survive to be scored on eta times as many folds, and so
+    on until the survivors have been scored on all cv folds. Scores come
+    from and go to a FoldScoreCache keyed by the split's data hash, so a
+    repeated or resumed search only fits what it has not seen. Each rung's
+    missing folds, across all models, run in one process pool. Estimators
+    with an unset random_state are seeded with RANDOM_STATE, so cached and
+    fresh scores come from identically seeded fits.
+    Args:
+        models: dict of name -> unfitted estimator with a space in SEARCH_SPACES
+        X, y: training split
+        cv: number of KFold folds
+        min_folds: folds scored in the first rung
+        eta: keep 1/eta of the configurations per rung
+        n_jobs: worker processes (-1 uses all cores)
+        cache_dir: where fold score files live, defaults to CACHE_DIR
+        log: callable for progress lines
+    Returns:
+        dict: per model the best params, their mean CV score and the rungs
+    """
+    from .train_model import as_task_arrays
+
+    splitter = KFold(n_splits=cv)
+    scheme = repr(splitter)
+    folds = list(splitter.split(X))
+    cache = FoldScoreCache(os.path.join(cache_dir or CACHE_DIR, f'{data_hash(X, y)[:20]}.jsonl'))
+    X, y = as_task_arrays(X, y)
+    models = {name: _seeded(model) for name, model in models.items() if name in SEARCH_SPACES}
+    alive = {name: [dict(params) for params in ParameterGrid(SEARCH_SPACES[name])] for name in models}
+    configs = {
+        (name, json.dumps(params, sort_keys=True)): config_key(models[name], params)
+        for name, candidates in alive.items() for params in candidates
+    }
+
+    def config(name, params):
+        return configs[name, json.dumps(params, sort_keys=True)]
+
+    rungs = {name: [] for name in alive}
+    done = {}
+    n_folds = min(min_folds, cv)
+
+    while alive:
+        tasks = [
+            (name, params, i)
+            for name, candidates in alive.items() for params in candidates for i in range(n_folds)
+            if cache.get(config(name, params), scheme, i) is None
+        ]
+        log(f'Rung on {n_folds}/{cv} folds: {sum(map(len, alive.values()))} configurations, '
+            f'{len(tasks)} fits to run, {len(cache)} cached')
+        start = time.time()
+        outputs = Parallel(n_jobs=n_jobs, return_as='generator_unordered')(
+            delayed(_score_fold)(name, models[name], params, i, folds[i], X, y) for name, params, i in tasks
+        )
+        for name, params, i, score, seconds in outputs:
+            cache.put(config(name, params), scheme, i, score, seconds, model=name, params=params)
+        if tasks:
+            log(f'  ran {len(tasks)} fits in {time.time() - start:.1f}s')
+
+        for name in list(alive):
+            ranked = sorted(
+                ((float(np.mean([cache.get(config(name, params), scheme, i) for i in range(n_folds)])), params)
+                 for params in alive[name]),
+                key=lambda item: item[0], reverse=True,
+            )
+            rungs[name].append({'folds': n_folds, 'scores': [{'params': p, 'score': s} for s, p in ranked]})
+            if n_folds == cv:
+                done[name] = {'params': ranked[0][1], 'score': ranked[0][0], 'rungs': rungs[name]}
+                del alive[name]
+            else:
+                alive[name] = [params for _, params in ranked[:max(1, math.ceil(len(ranked) / eta))]]
+        n_folds = min(n_folds * eta, cv)
+    return done
@@ -1,41 +1,56 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.svm import SVR
 from sklearn.metrics import r2_score, mean_squared_error
 import xgboost as xgb
 import joblib
+from joblib import Parallel, delayed
+import argparse
+import json
+import os
+import time
 import warnings
+from .artifacts import (
+    FEATURES, atomic_write, coef_table_path, export_coef_table, export_price_grid, file_checksum, model_version
+)
+from .dataset import encode_frame, load_dataset, training_matrix
+from .preprocessing import build_pipeline
+from .trees import export_tree_ensemble
 
-# Configuration
-PLOT_PATH = './sampleImages/'
-MODEL_PATH = 'mediapp/ml_models/insurance_model.pkl'
+# Configuration, relative to the project root so any working directory works
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_PATH = os.path.join(BASE_DIR, 'insurance.csv')
+PLOT_PATH = os.path.join(BASE_DIR, 'sampleImages', '')
+MODEL_PATH = os.path.join(BASE_DIR, 'mediapp', 'ml_models', 'insurance_model.pkl')
 
 # Set modern pandas options
 pd.set_option('future.no_silent_downcasting', True)
 warnings.filterwarnings('ignore', category=FutureWarning)
 
-def load_and_preprocess_data():
-    #Load and properly preprocess the insurance data
-    data = pd.read_csv('./mediapp/ml_models/insurance.csv')
-    
-    # Modern categorical conversion
-    cat_mapping = {
-        'sex': {'male': 0, 'female': 1},
-        'smoker': {'no': 0, 'yes': 1},
-        'region': {'northwest': 0, 'northeast': 1, 'southeast': 2, 'southwest': 3}
-    }
-    data = data.replace(cat_mapping).infer_objects(copy=False)
+def load_and_preprocess_data(path=DATA_PATH, extra_rows=None, use_cache=True):
+    #Load the insurance data as typed, encoded columns (cached by CSV hash), plus optional extra rows in the same schema
+    data = load_dataset(path, use_cache=use_cache)
+    if extra_rows is not None and len(extra_rows):
+        data = pd.concat([data, encode_frame(extra_rows)], ignore_index=True)
     
     return data
 
+def _pyplot():
+    # Plotting libraries are only imported when plots are requested, with a
+    # non-interactive backend so headless retrains never need a display
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
 def perform_eda(data):
     #Modernized EDA with updated seaborn functions"""
+    plt, sns = _pyplot()
     # Correlation plot
     plt.figure(figsize=(10, 8))
     sns.heatmap(data.corr(), cmap='BuPu', annot=True, fmt=".2f")
@@ -53,19 +68,14 @@ def perform_eda(data):
         plt.close()
 
 def prepare_model_data(data):
-    #Prepare scaled data for modeling"""
-    X = data.drop('charges', axis=1)
+    #Split encoded data for modeling; scaling is fitted inside each model's pipeline
+    X = training_matrix(data)
     y = data['charges']
     
-    # Scale only numerical features
-    scaler = StandardScaler()
-    for col in ['age', 'bmi']:
-        X[col] = scaler.fit_transform(X[[col]])
-    
     return train_test_split(X, y, test_size=0.2, random_state=42)
 
-def train_and_evaluate_models(X_train, X_test, y_train, y_test):
-    #Train and evaluate all models"""
+def candidate_models(params=None):
+    #Unfitted estimators compared on every retrain, with optional tuned hyperparameters by model name
     models = {
         'LinearRegression': LinearRegression(),
         'Ridge': Ridge(alpha=20, random_state=42),
@@ -76,25 +86,88 @@ def train_and_evaluate_models(X_train, X_test, y_train, y_test):
         ),
         'XGBoost': xgb.XGBRegressor(objective='reg:squarederror')
     }
-    
-    results = []
-    for name, model in models.items():
+    for name, overrides in (params or {}).items():
+        if name in models:
+            models[name].set_params(**overrides)
+    return models
+
+def as_task_arrays(*frames):
+    """
+    Contiguous float64 copies of the training data for pool tasks.
+
+    joblib memory-maps large numpy arrays into its workers once, but
+    pickles a DataFrame again for every task it is passed to.
+    Args:
+        frames: DataFrames, Series or arrays; None is passed through
+    Returns:
+        list: np.ndarray (or None) per argument
+    """
+    return [None if f is None else np.ascontiguousarray(f, dtype=np.float64) for f in frames]
+
+def _run_task(name, estimator, fold, X_train, y_train, X_test):
+    # One unit of work: the final fit (fold is None) or one CV fold
+    start = time.time()
+    X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+    model = build_pipeline(clone(estimator))
+    result = {'name': name, 'fold': fold}
+    if fold is None:
         model.fit(X_train, y_train)
-        cv_score = cross_val_score(model, X_train, y_train, cv=10).mean()
-        
+        result.update(model=model, test_pred=model.predict(X_test), train_pred=model.predict(X_train))
+    else:
+        train_idx, val_idx = fold
+        model.fit(X_train[train_idx], y_train[train_idx])
+        result['score'] = r2_score(y_train[val_idx], model.predict(X_train[val_idx]))
+    result.update(start=start, end=time.time())
+    return result
+
+def train_and_evaluate_models(X_train, X_test, y_train, y_test, n_jobs=1, cv=10, params=None):
+    """
+    Train and evaluate all candidate models
+    Args:
+        n_jobs: worker processes for fits and CV folds (-1 uses all cores)
+        cv: number of cross-validation folds
+        params: tuned hyperparameters by model name, e.g. from search_hyperparameters
+    Returns:
+        (pd.DataFrame, dict): metrics per model, fitted pipelines by name
+    """
+    models = candidate_models(params)
+
+    # Fold indices are computed once and shared by every model, and each
+    # (model, fold) fit is an independent task for the process pool
+    folds = list(KFold(n_splits=cv).split(X_train))
+    tasks = [(name, estimator, fold) for name, estimator in models.items() for fold in [None] + folds]
+    X_train_a, y_train_a, X_test_a = as_task_arrays(X_train, y_train, X_test)
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_run_task)(name, estimator, fold, X_train_a, y_train_a, X_test_a)
+        for name, estimator, fold in tasks
+    )
+
+    results = []
+    fitted = {}
+    for name in models:
+        runs = [o for o in outputs if o['name'] == name]
+        final = next(o for o in runs if o['fold'] is None)
+        fitted[name] = final['model']
+
+        # Test predictions are computed once per model and reused
+        test_pred = final['test_pred']
         metrics = {
             'Model': name,
-            'RMSE': np.sqrt(mean_squared_error(y_test, model.predict(X_test))),
-            'R2_Score(train)': r2_score(y_train, model.predict(X_train)),
-            'R2_Score(test)': r2_score(y_test, model.predict(X_test)),
-            'Cross-Validation': cv_score
+            'RMSE': np.sqrt(mean_squared_error(y_test, test_pred)),
+            'R2_Score(train)': r2_score(y_train, final['train_pred']),
+            'R2_Score(test)': r2_score(y_test, test_pred),
+            'Cross-Validation': np.mean([o['score'] for o in runs if o['fold'] is not None]),
+            # Total duration of this model's fits, not wall-clock time: its
+            # tasks run side by side with each other's and other models'
+            'Summed fit time (s)': sum(o['end'] - o['start'] for o in runs),
         }
         results.append(metrics)
     
-    return pd.DataFrame(results)
+    return pd.DataFrame(results), fitted
 
 def visualize_results(results_df):
     #Modern visualization with proper hue handling
+    plt, sns = _pyplot()
     plt.figure(figsize=(12, 7))
     ax = sns.barplot(
         x='Cross-Validation',
@@ -116,36 +189,78 @@ def visualize_results(results_df):
     plt.savefig(f'{PLOT_PATH}model_comparison.png', dpi=300)
     plt.close()
 
-def save_best_model(models, X_train):
+def save_best_model(models, X_train, path=MODEL_PATH, price_grid=True, name='LinearRegression'):
     #Save the best performing model
-    # Select LinearRegression as specified 
-    best_model = models['LinearRegression']
-    joblib.dump(best_model, MODEL_PATH)
-    print(f"Model saved to {MODEL_PATH}")
+    # Select LinearRegression as specified, unless another candidate is named
+    best_model = models[name]
+
+    # The side tables go first, tagged with the new artifact's checksum, and
+    # the .pkl replaces the old one last: a registry that sees the new .pkl
+    # always finds its tables. Until then the new tables do not match the
+    # old .pkl's version and are ignored
+    with atomic_write(path) as tmp_path:
+        # Uncompressed, so its numpy arrays can be loaded with mmap_mode
+        joblib.dump(best_model, tmp_path, compress=0)
+        version = model_version(tmp_path)
+
+        # Closed-form scorer input for linear models, tied to this artifact's checksum
+        if export_coef_table(best_model, path, baseline=X_train[FEATURES].mean().tolist(), version=version):
+            print(f"Coefficient table saved to {coef_table_path(path)}")
+
+        # Forests and boosted trees are served from a flat node array instead of
+        # the sklearn/xgboost objects; trees are never affine in BMI, so no grid
+        trees_path = export_tree_ensemble(best_model, path, version=version)
+        if trees_path:
+            print(f"Tree ensemble saved to {trees_path}")
 
-def main():
+        # Optional O(1) quote lookup over every discrete input combination
+        if price_grid and not trees_path:
+            grid_path = export_price_grid(best_model, path, version=version)
+            if grid_path:
+                print(f"Price grid saved to {grid_path}")
+    print(f"Model saved to {path}")
+
+def training_fingerprint(data_path=DATA_PATH, cv=10, extra=None, params=None):
+    """
+    Identify a training run by its inputs
+    Args:
+        data_path: training CSV, hashed by content
+        cv: number of cross-validation folds
+        extra: any other JSON-serializable input, e.g. a Prediction watermark
+        params: tuned hyperparameter overrides passed to candidate_models
+    Returns:
+        dict: data hash, hyperparameters and extras; equal dicts mean an
+        identical retrain
+    """
+    hyperparameters = {name: model.get_params() for name, model in candidate_models(params).items()}
+    return {
+        'data_sha256': file_checksum(data_path),
+        'hyperparameters': json.loads(json.dumps(hyperparameters, sort_keys=True, default=str)),
+        'cv': cv,
+        'extra': extra,
+    }
+
+def main(n_jobs=-1, plots=False):
     # Data pipeline
     data = load_and_preprocess_data()
-    perform_eda(data)
+    if plots:
+        perform_eda(data)
     X_train, X_test, y_train, y_test = prepare_model_data(data)
     
     # Model pipeline
-    results_df = train_and_evaluate_models(X_train, X_test, y_train, y_test)
-    visualize_results(results_df)
-    save_best_model({
-        'LinearRegression': LinearRegression().fit(X_train, y_train),
-        'RandomForest': RandomForestRegressor().fit(X_train, y_train)
-    }, X_train)
+    start = time.time()
+    results_df, models = train_and_evaluate_models(X_train, X_test, y_train, y_test, n_jobs=n_jobs)
+    print(f"Trained {len(models)} models in {time.time() - start:.1f}s")
+    if plots:
+        visualize_results(results_df)
+    save_best_model(models, X_train)
     
     print(results_df.sort_values('Cross-Validation', ascending=False))
 
-# Ensure DataFrame column names are preserved
-X = data[['age', 'sex', 'bmi', 'children', 'smoker', 'region']]  # Use DataFrame, not values
-y = data['charges']
-
-# This will preserve feature names in the model
-model.fit(X, y)
-
-
+# Run from the project root: python -m mediapp.ml_models.train_model
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train, compare and save the insurance cost models')
+    parser.add_argument('--jobs', type=int, default=-1, help='worker processes (-1 uses all cores)')
+    parser.add_argument('--plots', action='store_true', help='render EDA and comparison plots')
+    args = parser.parse_args()
+    main(n_jobs=args.jobs, plots=args.plots)
\ No newline at end of file
@@ -0,0 +1,277 @@
+import json
+import os
+
+import numpy as np
+
+from .artifacts import atomic_write, model_version, pipeline_column_order
+from .schema import ENCODINGS, FEATURES
+
+# One record per tree node. Siblings are stored next to each other, so a
+# row moves to left + (x > threshold). Leaves point at themselves with an
+# infinite threshold, so every row can take the same number of steps
+# through every tree without checking for leaves. 'value' is the node's
+# output: the prediction at leaves, the training mean at inner nodes
+NODE_DTYPE = np.dtype([('feature', '<i4'), ('left', '<i4'), ('threshold', '<f8'), ('value', '<f8')])
+
+# Rows are scored in chunks of at most this many (row, tree) cells
+CHUNK_CELLS = 1 << 20
+
+
+def tree_ensemble_paths(model_path):
+    stem = os.path.splitext(model_path)[0]
+    return stem + '_trees.npy', stem + '_trees.json'
+
+
+def _flatten(trees):
+    # trees: (feature, left, right, threshold, value, is_leaf) arrays per
+    # tree with tree-local child indices; returns one node array and each
+    # tree's root
+    nodes = np.empty(sum(len(tree[0]) for tree in trees), dtype=NODE_DTYPE)
+    roots, depth, offset = [], 0, 0
+    for feature, left, right, threshold, value, leaf in trees:
+        # Breadth-first renumbering that places each node's children side by side
+        order, depths, new_id = [0], [0], {0: 0}
+        for i in order:
+            if not leaf[i]:
+                for child in (left[i], right[i]):
+                    new_id[child] = len(order)
+                    order.append(child)
+                    depths.append(depths[new_id[i]] + 1)
+        order = np.array(order)
+        ids = np.arange(len(order)) + offset
+        first_child = np.array([new_id.get(c, 0) for c in left[order]]) + offset
+        is_leaf = leaf[order]
+        block = nodes[offset:offset + len(order)]
+        block['feature'] = np.where(is_leaf, 0, feature[order])
+        block['left'] = np.where(is_leaf, ids, first_child)
+        block['threshold'] = np.where(is_leaf, np.inf, threshold[order])
+        block['value'] = value[order]
+        depth = max(depth, max(depths))
+        roots.append(offset)
+        offset += len(order)
+    return nodes, roots, depth
+
+
+def _sklearn_trees(estimator):
+    # A single regression tree or a forest that averages them
+    trees = [estimator] if hasattr(estimator, 'tree_') else getattr(estimator, 'estimators_', None)
+    if trees is None or not all(hasattr(tree, 'tree_') for tree in trees) or getattr(estimator, 'n_outputs_', 1) != 1:
+        return None
+    flat = []
+    for tree in trees:
+        t = tree.tree_
+        leaf = t.children_left == -1
+        # sklearn compares float32(x) <= threshold
+        flat.append((t.feature, t.children_left, t.children_right, t.threshold, t.value[:, 0, 0], leaf))
+    return flat, 'mean', 0.0
+
+
+def _xgboost_trees(estimator):
+    # Gradient-boosted trees with an identity link: base_score + sum of leaves
+    if not hasattr(estimator, 'get_booster'):
+        return None
+    learner = json.loads(estimator.get_booster().save_raw('json'))['learner']
+    if learner['objective']['name'] != 'reg:squarederror' or learner['learner_model_param'].get('num_target', '1') != '1':
+        return None
+    gbtree = learner['gradient_booster'].get('model', {})
+    trees = gbtree.get('trees')
+    if trees is None:
+        return None
+    # Early-stopped models predict with the trees up to the best round
+    best = getattr(estimator, 'best_iteration', None)
+    if best is not None:
+        trees = trees[:gbtree['iteration_indptr'][best + 1]]
+
+    flat = []
+    for tree in trees:
+        if any(tree['split_type']):
+            return None
+        left = np.array(tree['left_children'], dtype=np.int64)
+        leaf = left == -1
+        split = np.array(tree['split_conditions'], dtype=np.float32)
+        # XGBoost goes left when float32(x) < split; the largest float32
+        # below the split turns that into the same <= test sklearn uses.
+        threshold = np.nextafter(split, np.float32(-np.inf)).astype(np.float64)
+        # Leaves keep their output in split_conditions; an inner node's value
+        # is the cover-weighted mean of its children, as XGBoost's own
+        # approximate contributions use
+        right = np.array(tree['right_children'], dtype=np.int64)
+        cover = np.array(tree['sum_hessian'], dtype=np.float64)
+        value = np.where(leaf, split, 0.0).astype(np.float64)
+        order = [0]
+        for i in order:
+            if not leaf[i]:
+                order += [left[i], right[i]]
+        for i in reversed(order):
+            if not leaf[i]:
+                value[i] = (value[left[i]] * cover[left[i]] + value[right[i]] * cover[right[i]]) / cover[i]
+        flat.append((np.array(tree['split_indices']), left, right, threshold, value, leaf))
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    return flat, 'sum', base_score
+
+
+def export_tree_ensemble(model, model_path, version=None):
+    """
+    Write a tree-ensemble pipeline's nodes as one flat NumPy array.
+
+    Every tree of a scikit-learn forest or decision tree, or of an XGBoost
+    regressor, is flattened into a record array of (feature, left,
+    threshold, value) nodes, with the scaler and aggregation in a JSON side file.
+    score_tree_ensemble walks all trees for all rows at once, so serving
+    needs neither sklearn nor xgboost.
+    Args:
+        model: fitted Pipeline (encode -> scale -> model) saved at model_path
+        model_path: path of the saved model artifact
+        version: model_version() of the artifact, when model_path does not
+            hold it yet
+    Returns:
+        str: path of the .npy node array, or None if the model is not a
+        supported tree ensemble
+    """
+    try:
+        scaler = model.named_steps['scale'].named_transformers_['scaler']
+        estimator = model.named_steps['model']
+    except (AttributeError, KeyError):
+        return None
+    order = pipeline_column_order(model)
+    if order is None:
+        return None
+    exported = _sklearn_trees(estimator) or _xgboost_trees(estimator)
+    if exported is None:
+        return None
+    trees, aggregate, base = exported
+    nodes, roots, depth = _flatten(trees)
+
+    npy_path, meta_path = tree_ensemble_paths(model_path)
+    with atomic_write(npy_path) as tmp_path, open(tmp_path, 'wb') as f:
+        np.save(f, nodes)
+    meta = {
+        'model_version': version or model_version(model_path),
+        'features': FEATURES,
+        'encodings': ENCODINGS,
+        'estimator': type(estimator).__name__,
+        'order': order,
+        'mean': [float(m) for m in scaler.mean_],
+        'scale': [float(s) for s in scaler.scale_],
+        'aggregate': aggregate,
+        'base': base,
+        'depth': depth,
+        'roots': roots,
+    }
+    with atomic_write(meta_path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    return npy_path
+
+
+def load_tree_ensemble(model_path, version):
+    """
+    Memory-map the flattened tree ensemble saved next to a model artifact
+    Returns:
+        dict: the JSON metadata with 'nodes' (read-only node array) and
+        'roots' and scaler arrays, or None if there is no ensemble for this
+        model version
+    """
+    npy_path, meta_path = tree_ensemble_paths(model_path)
+    try:
+        with open(meta_path) as f:
+            ensemble = json.load(f)
+        if (ensemble.get('model_version') != version or ensemble.get('features') != FEATURES
+                or ensemble.get('encodings') != ENCODINGS):
+            return None
+        nodes = np.load(npy_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if nodes.dtype != NODE_DTYPE:
+        return None
+    ensemble['nodes'] = nodes
+    for field in NODE_DTYPE.names:
+        ensemble[field] = nodes[field]
+    ensemble['roots'] = np.array(ensemble['roots'], dtype=np.int32)
+    ensemble['mean'] = np.array(ensemble['mean'], dtype=np.float64)
+    ensemble['scale'] = np.array(ensemble['scale'], dtype=np.float64)
+    return ensemble
+
+
+def _scaled(X, ensemble):
+    # Encoded rows as the trees see them: scaled like the pipeline, then
+    # rounded to float32 as sklearn and XGBoost do before split tests
+    Z = np.asarray(X, dtype=np.float64)[:, ensemble['order']]
+    k = len(ensemble['mean'])
+    Z[:, :k] -= ensemble['mean']
+    Z[:, :k] /= ensemble['scale']
+    return Z.astype(np.float32).astype(np.float64)
+
+
+def _chunks(Z, ensemble):
+    # Row blocks small enough that their (rows, trees) node arrays stay bounded
+    step = max(1, CHUNK_CELLS // len(ensemble['roots']))
+    for start in range(0, len(Z), step):
+        chunk = Z[start:start + step]
+        # Flat index of (row, column 0); adding a feature index addresses a cell
+        row_offset = (np.arange(len(chunk)) * chunk.shape[1])[:, None]
+        yield start, chunk.ravel(), row_offset, np.broadcast_to(ensemble['roots'], (len(chunk), len(ensemble['roots'])))
+
+
+def _aggregate(per_tree, ensemble):
+    # Combine (n, trees) node values into one output per row
+    if ensemble['aggregate'] == 'mean':
+        return per_tree.mean(axis=1)
+    return per_tree.sum(axis=1) + ensemble['base']
+
+
+def score_tree_ensemble(X, ensemble):
+    """
+    Score an encoded (n, 6) matrix with a flattened tree ensemble.
+
+    Inputs are scaled as the pipeline does and rounded to float32, as both
+    sklearn and XGBoost do before comparing them with split thresholds, so
+    every row reaches the same leaves as with the native estimator.
+    Args:
+        X: encoded (n, 6) matrix
+        ensemble: dict from load_tree_ensemble
+    Returns:
+        np.ndarray: predicted cost per row
+    """
+    Z = _scaled(X, ensemble)
+    feature, left, threshold, value = (ensemble[field] for field in NODE_DTYPE.names)
+    out = np.empty(len(Z))
+    for start, flat, row_offset, node in _chunks(Z, ensemble):
+        for _ in range(ensemble['depth']):
+            node = left[node] + (flat[row_offset + feature[node]] > threshold[node])
+        out[start:start + len(node)] = _aggregate(value[node], ensemble)
+    return out
+
+
+def tree_path_contributions(X, ensemble):
+    """
+    Approximate per-feature cost contributions from a flattened tree ensemble.
+
+    Every split on a row's path credits its feature with the change in node
+    value it causes (Saabas path attribution, as XGBoost's approx_contribs).
+    Per tree these add up to the leaf value minus the root value, so the base
+    cost plus a row's contributions is that row's price. Unlike TreeSHAP this
+    is not a Shapley value: a feature's share depends on where in the tree it
+    is split, and features that interact are credited unevenly.
+    Args:
+        X: encoded (n, 6) matrix
+        ensemble: dict from load_tree_ensemble
+    Returns:
+        (float, np.ndarray): cost at the tree roots (the training average)
+        and (n, 6) contributions in FEATURES order
+    """
+    Z = _scaled(X, ensemble)
+    feature, left, threshold, value = (ensemble[field] for field in NODE_DTYPE.names)
+    scaled = np.zeros(Z.shape)
+    for start, flat, row_offset, node in _chunks(Z, ensemble):
+        block = scaled[start:start + len(node)]
+        for _ in range(ensemble['depth']):
+            cell = row_offset + feature[node]
+            child = left[node] + (flat[cell] > threshold[node])
+            # Leaves step to themselves and add nothing
+            block += np.bincount(cell.ravel(), (value[child] - value[node]).ravel(), block.size).reshape(block.shape)
+            node = child
+    if ensemble['aggregate'] == 'mean':
+        scaled /= len(ensemble['roots'])
+    contributions = np.empty((len(Z), len(FEATURES)))
+    contributions[:, ensemble['order']] = scaled
+    return float(_aggregate(value[ensemble['roots']][None, :], ensemble)[0]), contributions
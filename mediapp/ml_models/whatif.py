@@ -0,0 +1,88 @@
+import numpy as np
+
+from .encoding import encode_records
+from .schema import ENCODINGS, FEATURES
+
+# Points on the sensitivity curves; the training data covers ages 18-64
+BMI_CURVE = np.arange(15.0, 45.5, 1.0)
+AGE_CURVE = np.arange(18, 65)
+
+# Valid input ranges, the same as PredictionForm's
+BMI_RANGE = (10.0, 50.0)
+AGE_RANGE = (0, 120)
+
+
+def _point_variants(applicant):
+    # (label, feature, new value) for each single-feature edit worth showing
+    age, bmi, children = applicant['age'], applicant['bmi'], applicant['children']
+    variants = []
+    for label, value in (('Non-smoker', 'no'), ('Smoker', 'yes')):
+        if applicant['smoker'] != value:
+            variants.append((label, 'smoker', value))
+    for delta in (-5, 5):
+        value = round(min(max(bmi + delta, BMI_RANGE[0]), BMI_RANGE[1]), 2)
+        if value != bmi:
+            variants.append((f'BMI {delta:+d}', 'bmi', value))
+    if children > 0:
+        variants.append(('One child fewer', 'children', children - 1))
+    variants.append(('One more child', 'children', children + 1))
+    for delta in (-10, 10):
+        value = min(max(age + delta, AGE_RANGE[0]), AGE_RANGE[1])
+        if value != age:
+            variants.append((f'Age {delta:+d}', 'age', value))
+    for region in sorted(ENCODINGS['region']):
+        if region != applicant['region']:
+            variants.append((f'Living in the {region}', 'region', region))
+    return variants
+
+
+def build_variants(applicant):
+    """
+    Encode an applicant and all of their counterfactuals as one matrix
+    Args:
+        applicant: dict with the keys in FEATURES, labels lowercase
+    Returns:
+        (list, np.ndarray): point variants as (label, feature, value), and an
+        (n, 6) matrix whose rows are the applicant, each point variant, then
+        the BMI curve and the age curve
+    """
+    base = encode_records([applicant])[0]
+    variants = _point_variants(applicant)
+    X = np.repeat(base[None, :], 1 + len(variants) + len(BMI_CURVE) + len(AGE_CURVE), axis=0)
+    for row, (_, feature, value) in enumerate(variants, start=1):
+        codes = ENCODINGS.get(feature)
+        X[row, FEATURES.index(feature)] = codes[value] if codes else value
+    start = 1 + len(variants)
+    X[start:start + len(BMI_CURVE), FEATURES.index('bmi')] = BMI_CURVE
+    X[start + len(BMI_CURVE):, FEATURES.index('age')] = AGE_CURVE
+    return variants, X
+
+
+def what_if(applicant, score):
+    """
+    Price an applicant's counterfactual variants with a single model call
+    Args:
+        applicant: dict with the keys in FEATURES, labels lowercase
+        score: callable mapping an encoded (n, 6) matrix to costs
+    Returns:
+        dict: base cost, point variants with their cost and change, and
+        cost curves over BMI and age
+    """
+    variants, X = build_variants(applicant)
+    costs = np.asarray(score(X), dtype=np.float64).round(2)
+    base = float(costs[0])
+    start = 1 + len(variants)
+    bmi_costs = costs[start:start + len(BMI_CURVE)]
+    age_costs = costs[start + len(BMI_CURVE):]
+    return {
+        'base_cost': base,
+        'variants': [
+            {'label': label, 'feature': feature, 'value': value,
+             'predicted_cost': float(cost), 'difference': round(float(cost) - base, 2)}
+            for (label, feature, value), cost in zip(variants, costs[1:start])
+        ],
+        'curves': {
+            'bmi': {'x': BMI_CURVE.tolist(), 'predicted_cost': bmi_costs.tolist()},
+            'age': {'x': AGE_CURVE.tolist(), 'predicted_cost': age_costs.tolist()},
+        },
+    }
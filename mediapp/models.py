@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -36,6 +39,134 @@ class Prediction(models.Model):
     region = models.CharField(max_length=10, choices=REGION_CHOICES)
     predicted_cost = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # How the model that priced this row splits its cost: base_cost (the
+    # average training applicant) plus one contribution per input, in
+    # CONTRIBUTION_FIELDS order
+    model_version = models.CharField(max_length=12, blank=True)
+    base_cost = models.FloatField(null=True, blank=True)
+    contributions = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves a user's history newest-first and keyset page lookups
+            models.Index(fields=['user', '-created_at', '-id'], name='prediction_user_created_idx'),
+        ]
     
+    # Model fields behind each position of contributions (the model's FEATURES order)
+    CONTRIBUTION_FIELDS = ['age', 'gender', 'bmi', 'children', 'smoker', 'region']
+
     def __str__(self):
         return f'Prediction for {self.user.username}'
+
+    def set_explanation(self, explanation, row=0):
+        """Keep one row of a predict.explain_batch() result on this prediction"""
+        if explanation is None:
+            return
+        self.model_version = explanation['model_version']
+        self.base_cost = round(explanation['base_cost'], 2)
+        self.contributions = [round(c, 2) for c in explanation['contributions'][row].tolist()]
+
+    def contribution_items(self):
+        """(field, entered value, contribution) per input, largest effect first"""
+        if not self.contributions:
+            return []
+        items = [(name, getattr(self, name), value) for name, value in zip(self.CONTRIBUTION_FIELDS, self.contributions)]
+        return sorted(items, key=lambda item: abs(item[2]), reverse=True)
+
+
+class PredictionStats(models.Model):
+    """Running per-user totals, kept in step with every saved Prediction"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='prediction_stats')
+    count = models.PositiveIntegerField(default=0)
+    # Predictions with a predicted_cost; the average is over these only
+    priced_count = models.PositiveIntegerField(default=0)
+    total_cost = models.FloatField(default=0)
+    min_cost = models.FloatField(null=True, blank=True)
+    max_cost = models.FloatField(null=True, blank=True)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Prediction stats for {self.user.username}'
+
+    @property
+    def avg_cost(self):
+        return self.total_cost / self.priced_count if self.priced_count else 0
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's stats row, or an unsaved empty one if they have none yet"""
+        return cls.objects.filter(user=user).first() or cls(user=user)
+
+    @classmethod
+    async def afor_user(cls, user):
+        return await cls.objects.filter(user=user).afirst() or cls(user=user)
+
+    @classmethod
+    def record(cls, user, predictions):
+        """
+        Fold newly saved predictions into the user's totals.
+
+        Call inside the same transaction.atomic() block that saved them, so
+        the totals and the history can never disagree.
+        Args:
+            user: owner of the predictions
+            predictions: saved Prediction instances
+        """
+        if not predictions:
+            return
+        costs = [p.predicted_cost for p in predictions if p.predicted_cost is not None]
+        last_created_at = max(p.created_at for p in predictions)
+        cls.objects.get_or_create(user=user)
+        updates = {
+            'count': F('count') + len(predictions),
+            'last_created_at': Greatest(Coalesce('last_created_at', Value(last_created_at)), Value(last_created_at)),
+        }
+        if costs:
+            updates.update(
+                priced_count=F('priced_count') + len(costs),
+                total_cost=F('total_cost') + sum(costs),
+                min_cost=Least(Coalesce('min_cost', Value(min(costs))), Value(min(costs))),
+                max_cost=Greatest(Coalesce('max_cost', Value(max(costs))), Value(max(costs))),
+            )
+        cls.objects.filter(user=user).update(**updates)
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent by the send_outbox worker.
+
+    While a worker holds a message it is 'sending' and next_attempt_at is
+    the end of the worker's lease; a lease that runs out (the worker died
+    mid-batch) makes the message due again.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls for due pending messages in this order
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {", ".join(self.to)} ({self.status})'
@@ -0,0 +1,144 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Retry schedule: RETRY_BASE_SECONDS * 2 ** (attempts - 1), capped at
+# RETRY_MAX_SECONDS; a message is marked failed after MAX_ATTEMPTS tries.
+# A claimed batch must be sent within LEASE_SECONDS or other workers may retake it
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+BATCH_SIZE = 50
+
+
+def enqueue_email(subject, body, to, from_email=None, reply_to=None):
+    """
+    Queue an email for the send_outbox worker instead of sending it inline
+    Args:
+        subject: str
+        body: plain text body
+        to: list of recipient addresses
+        from_email: sender, defaults to DEFAULT_FROM_EMAIL
+        reply_to: optional list of reply-to addresses
+    Returns:
+        OutboxEmail: the saved message
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        reply_to=list(reply_to or []),
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try after the given number of failures"""
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', RETRY_BASE_SECONDS)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', RETRY_MAX_SECONDS)
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+def claim_due(batch_size, lease_seconds):
+    """
+    Take up to batch_size due messages for this worker in one short transaction.
+
+    Due rows are locked with SKIP LOCKED (where the database supports it)
+    and marked 'sending' until the lease ends, so several workers never
+    send the same message and no lock is held while mail is sent.
+    Returns:
+        list: claimed OutboxEmail rows, with attempts already counted
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING], next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if due:
+            lease_until = now + timedelta(seconds=lease_seconds)
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in due]).update(
+                status=OutboxEmail.SENDING, next_attempt_at=lease_until, attempts=F('attempts') + 1,
+            )
+            for email in due:
+                email.status = OutboxEmail.SENDING
+                email.next_attempt_at = lease_until
+                email.attempts += 1
+    return due
+
+
+def _record(email, error, max_attempts):
+    # One short autocommit write per result; only rows this worker still
+    # holds are updated, so an expired and re-claimed lease is left alone
+    if error is None:
+        updates = {'status': OutboxEmail.SENT, 'sent_at': timezone.now(), 'last_error': ''}
+    elif email.attempts >= max_attempts:
+        updates = {'status': OutboxEmail.FAILED, 'last_error': error}
+        logger.error('Giving up on outbox email %s after %s attempts: %s', email.pk, email.attempts, error)
+    else:
+        updates = {
+            'status': OutboxEmail.PENDING, 'last_error': error,
+            'next_attempt_at': timezone.now() + timedelta(seconds=retry_delay(email.attempts)),
+        }
+        logger.warning('Outbox email %s failed (attempt %s), retrying: %s', email.pk, email.attempts, error)
+    OutboxEmail.objects.filter(
+        pk=email.pk, status=OutboxEmail.SENDING, next_attempt_at=email.next_attempt_at,
+    ).update(**updates)
+
+
+def send_pending(batch_size=BATCH_SIZE, connection=None):
+    """
+    Send one batch of due outbox messages over a single mail connection.
+
+    The batch is claimed in a short transaction and sent outside it, so a
+    slow SMTP server never holds a database lock. A failed message (or a
+    connection that cannot be opened) is rescheduled with exponential
+    backoff and does not stop the rest of the batch.
+    Args:
+        batch_size: most messages to send in this call
+        connection: mail backend to reuse, defaults to get_connection()
+    Returns:
+        tuple: (sent, failed) message counts for this batch
+    """
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', MAX_ATTEMPTS)
+    due = claim_due(batch_size, getattr(settings, 'OUTBOX_LEASE_SECONDS', LEASE_SECONDS))
+    if not due:
+        return 0, 0
+    connection = connection or get_connection()
+    sent = failed = 0
+
+    # One SMTP session for the whole batch instead of one per message
+    try:
+        connection.open()
+    except Exception as e:
+        for email in due:
+            _record(email, f'{type(e).__name__}: {e}', max_attempts)
+        return 0, len(due)
+    try:
+        for email in due:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.to,
+                reply_to=email.reply_to, connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                _record(email, f'{type(e).__name__}: {e}', max_attempts)
+            else:
+                sent += 1
+                _record(email, None, max_attempts)
+    finally:
+        connection.close()
+    return sent, failed
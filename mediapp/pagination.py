@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+# Rows per page of prediction history
+PAGE_SIZE = 20
+
+
+def encode_cursor(prediction):
+    """Opaque cursor pointing just past a prediction in newest-first order"""
+    raw = f'{prediction.created_at.isoformat()}|{prediction.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Reverse encode_cursor
+    Returns:
+        (datetime, int): created_at and id, or None for a malformed cursor
+    """
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return one newest-first page of predictions using keyset pagination.
+
+    The page is located with a (created_at, id) range filter rather than an
+    OFFSET, so it is served from the (user, -created_at, -id) index in the
+    same time however deep into the history it is.
+    Args:
+        queryset: predictions already filtered to one user
+        cursor: value from a previous page's next_cursor, or None for the newest page
+        page_size: rows per page
+    Returns:
+        (list, str): the page's predictions and the cursor for the next page
+        (None on the last page)
+    """
+    rows = list(_page_queryset(queryset, cursor, page_size))
+    return _split_page(rows, page_size)
+
+
+async def akeyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """keyset_page for async views, fetched through the async ORM"""
+    rows = [row async for row in _page_queryset(queryset, cursor, page_size)]
+    return _split_page(rows, page_size)
+
+
+def _page_queryset(queryset, cursor, page_size):
+    # One row more than a page tells whether an older page exists
+    queryset = queryset.order_by('-created_at', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset[:page_size + 1]
+
+
+def _split_page(rows, page_size):
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
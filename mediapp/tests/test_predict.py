@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from mediapp.ml_models.encoding import quantize_bmi
+from mediapp.ml_models.predict import predict, score_frame
+from mediapp.ml_models.train_model import DATA_PATH
+
+
+class BmiRoundingTests(SimpleTestCase):
+    def test_scalar_and_array_round_alike(self):
+        bmis = np.array([29.925, 38.095, 22.705, 33.0, 30.875])
+        self.assertEqual([quantize_bmi(b) for b in bmis], quantize_bmi(bmis).tolist())
+
+    def test_predict_matches_score_frame(self):
+        # The single-quote path and the batch path price every applicant of
+        # insurance.csv the same, including its three-decimal BMIs
+        frame = pd.read_csv(DATA_PATH)
+        single = np.array([predict(*row) for row in frame[['age', 'sex', 'bmi', 'children', 'smoker', 'region']]
+                           .itertuples(index=False)])
+        np.testing.assert_allclose(single, score_frame(frame), rtol=0, atol=1e-6)
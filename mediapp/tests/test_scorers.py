@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from django.test import SimpleTestCase
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from mediapp.ml_models.artifacts import (
+    export_coef_table, export_price_grid, load_coef_table, load_price_grid, score_coef_table, score_price_grid,
+)
+from mediapp.ml_models.predict import encode_frame
+from mediapp.ml_models.preprocessing import build_pipeline
+from mediapp.ml_models.train_model import DATA_PATH
+from mediapp.ml_models.trees import export_tree_ensemble, load_tree_ensemble, score_tree_ensemble
+
+VERSION = 'test'
+
+
+class SideTableScorerTests(SimpleTestCase):
+    """Every fast scorer prices insurance.csv as the sklearn pipeline it was exported from"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.frame = pd.read_csv(DATA_PATH)
+        cls.X = encode_frame(cls.frame)
+        cls.y = cls.frame['charges'].to_numpy()
+        cls.tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def fit(self, estimator, name):
+        model = build_pipeline(estimator).fit(self.X, self.y)
+        return model, os.path.join(self.tmp.name, f'{name}.pkl')
+
+    def test_coef_table_is_bit_for_bit(self):
+        model, path = self.fit(LinearRegression(), 'linear')
+        export_coef_table(model, path, version=VERSION)
+        table = load_coef_table(path, VERSION)
+        np.testing.assert_array_equal(score_coef_table(self.X, table), model[1:].predict(self.X))
+
+    def test_price_grid(self):
+        model, path = self.fit(LinearRegression(), 'grid')
+        export_price_grid(model, path, version=VERSION)
+        grid = load_price_grid(path, VERSION)
+        costs = [
+            score_price_grid(grid, int(age), sex, bmi, int(children), smoker, region)
+            for (age, _, bmi, children, _, _), sex, smoker, region
+            in zip(self.X, self.frame['sex'], self.frame['smoker'], self.frame['region'])
+        ]
+        np.testing.assert_allclose(costs, model[1:].predict(self.X), rtol=1e-9)
+
+    def test_node_array_matches_forest(self):
+        model, path = self.fit(RandomForestRegressor(n_estimators=25, min_samples_leaf=5, random_state=0), 'forest')
+        export_tree_ensemble(model, path, version=VERSION)
+        ensemble = load_tree_ensemble(path, VERSION)
+        np.testing.assert_allclose(score_tree_ensemble(self.X, ensemble), model[1:].predict(self.X), rtol=1e-12)
+
+    def test_node_array_matches_xgboost(self):
+        # XGBoost sums its leaves in float32, the node array in float64
+        model, path = self.fit(xgb.XGBRegressor(objective='reg:squarederror', n_estimators=50), 'xgboost')
+        export_tree_ensemble(model, path, version=VERSION)
+        ensemble = load_tree_ensemble(path, VERSION)
+        np.testing.assert_allclose(score_tree_ensemble(self.X, ensemble), model[1:].predict(self.X), rtol=1e-6)
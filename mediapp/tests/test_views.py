@@ -0,0 +1,35 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from mediapp.models import Prediction
+
+APPLICANT = {'age': 30, 'sex': 'male', 'bmi': 29.925, 'children': 1, 'smoker': 'no', 'region': 'southeast'}
+
+
+class PredictionBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('batch', password='batch')
+        self.client.force_login(self.user)
+
+    def post(self, body, query='', content_type='application/json'):
+        return self.client.post(f'/prediction/batch/{query}', body, content_type=content_type)
+
+    def test_save_stores_validated_values(self):
+        # Whole numbers sent as decimal strings are priced, so they must save too
+        response = self.post(json.dumps([{**APPLICANT, 'age': '30.0', 'children': '1.0', 'sex': 'Male'}]), '?save=1')
+        self.assertEqual(response.status_code, 200)
+        saved = Prediction.objects.get(id=response.json()['predictions'][0]['id'])
+        self.assertEqual((saved.age, saved.children, saved.gender, saved.bmi), (30, 1, 'male', 29.92))
+        self.assertEqual(saved.predicted_cost, response.json()['predictions'][0]['predicted_cost'])
+
+    def test_rejects_json_object(self):
+        response = self.post(json.dumps({'a': 1}))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], ['Expected a non-empty list of applicants'])
+
+    def test_accepts_ndjson(self):
+        body = '\n'.join(json.dumps(APPLICANT) for _ in range(3))
+        self.assertEqual(self.post(body).json()['count'], 3)
+        self.assertEqual(self.post(json.dumps(APPLICANT), content_type='application/x-ndjson').json()['count'], 1)
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# Prediction pages served by the async views under ASGI
+prediction_views = async_views if getattr(settings, 'ASYNC_VIEWS', False) else views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -9,8 +13,13 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='mediapp/login.html'), name='login'),
     path('logout/', views.logout_view, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', prediction_views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
-    path('prediction/new/', views.prediction_new, name='prediction_new'),
-    path('prediction/<int:prediction_id>/result/', views.prediction_result, name='prediction_result'),
+    path('prediction/new/', prediction_views.prediction_new, name='prediction_new'),
+    path('prediction/batch/', views.prediction_batch, name='prediction_batch'),
+    path('prediction/history/', views.prediction_history, name='prediction_history'),
+    path('prediction/<int:prediction_id>/result/', prediction_views.prediction_result, name='prediction_result'),
+    path('prediction/<int:prediction_id>/what-if/', views.prediction_what_if, name='prediction_what_if'),
+    path('model/info/', views.model_info, name='model_info'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
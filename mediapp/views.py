@@ -1,18 +1,37 @@
 
-import numpy as np
-import joblib
-import os
+import hmac
+import json
+import logging
+import sys
+from datetime import timedelta
 from django.shortcuts import render, redirect
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
 from django.conf import settings
-from .forms import UserRegisterForm, PredictionForm, ProfileUpdateForm, ContactForm
+from django.db import transaction
+from django.db.models import Avg
+from django.db.models.functions import TruncDate
+from .forms import UserRegisterForm, PredictionForm, ProfileUpdateForm, ContactForm, clean_batch
 from django.contrib.auth import logout
 from .forms import UserRegisterForm, PredictionForm, ProfileUpdateForm
-from .models import Prediction, Profile
-from mediapp.ml_models.predict import predict
+from .metrics import gauge, request_latency, stage_latency, timed
+from .models import Prediction, PredictionStats, Profile
+from .outbox import enqueue_email
+from .pagination import keyset_page, PAGE_SIZE
+from mediapp.ml_models.schema import ENCODINGS, FEATURES
+
+logger = logging.getLogger(__name__)
+
+# Category label for each encoded value, to store batch rows from their codes
+LABELS = {name: {code: label for label, code in codes.items()} for name, codes in ENCODINGS.items()}
+
+# numpy and the model stack (mediapp.ml_models.predict and what it imports)
+# are imported inside the views that score, so startup, migrate and the
+# pages that never predict do not pay for them
 
 
 def home(request):
@@ -24,7 +43,6 @@ def about(request):
     return render(request, 'mediapp/about.html')
 
 def contact(request):
-    return render(request, 'mediapp/contact.html')
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
@@ -36,20 +54,16 @@ def contact(request):
             # Format email message
             email_message = f"Name: {name}\nEmail: {email}\n\nMessage:\n{message}"
             
-            # Send email to admin
-            admin_email = settings.ADMIN_EMAIL if hasattr(settings, 'ADMIN_EMAIL') else 'admin@medicost.com'
-            
-            try:
-                send_mail(
-                    message=email_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@medicost.com',
-                    recipient_list=[admin_email],
-                    fail_silently=False,
-                )
-                messages.success(request, 'Your message has been sent successfully!')
-                return redirect('contact')
-            except Exception as e:
-                messages.error(request, f'Failed to send message: {str(e)}')
+            # Queue the email for the send_outbox worker; SMTP never runs in the request
+            admin_email = getattr(settings, 'ADMIN_EMAIL', 'admin@medicost.com')
+            enqueue_email(
+                subject=f'Contact form: {subject}',
+                body=email_message,
+                to=[admin_email],
+                reply_to=[email],
+            )
+            messages.success(request, 'Your message has been sent successfully!')
+            return redirect('contact')
         else:
             messages.error(request, 'Please correct the errors in the form.')
     else:
@@ -74,27 +88,62 @@ def logout_view(request):
     messages.success(request, 'You have been successfully logged out.')
     return render(request, 'mediapp/logout.html')
 
-@login_required
-def dashboard(request):
-    predictions = Prediction.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Get data for visualizations
+# Days of history the dashboard chart covers, ending at the user's latest prediction
+CHART_DAYS = getattr(settings, 'DASHBOARD_CHART_DAYS', 90)
+
+def daily_costs(predictions, stats):
+    # (day, average cost) rows for the history chart, computed by the database.
+    # The date window keeps this a range scan on (user, created_at) instead
+    # of an aggregate over the user's whole history
+    if stats.last_created_at is None:
+        return predictions.none().values_list('created_at', 'predicted_cost')
+    since = stats.last_created_at - timedelta(days=CHART_DAYS)
+    return (
+        predictions.filter(created_at__gte=since)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(avg_cost=Avg('predicted_cost'))
+        .order_by('day')
+        .values_list('day', 'avg_cost')
+    )
+
+def history_columns(predictions):
+    # Only the fields the history table renders
+    return predictions.only('id', 'created_at', 'age', 'bmi', 'smoker', 'predicted_cost')
+
+def dashboard_context(stats, daily, page, next_cursor, cursor):
     prediction_data = {
-        'dates': [p.created_at.strftime('%Y-%m-%d') for p in predictions],
-        'costs': [p.predicted_cost for p in predictions],
+        'dates': json.dumps([day.strftime('%Y-%m-%d') for day, _ in daily]),
+        'costs': json.dumps([round(cost, 2) if cost is not None else None for _, cost in daily]),
     }
-    
-    # Get average prediction
-    avg_cost = 0
-    if predictions:
-        avg_cost = sum(p.predicted_cost for p in predictions) / len(predictions)
-    
-    context = {
-        'predictions': predictions,
+    return {
+        'predictions': page,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
         'prediction_data': prediction_data,
-        'avg_cost': avg_cost,
+        'chart_days': CHART_DAYS,
+        'stats': stats,
+        'avg_cost': stats.avg_cost,
     }
-    return render(request, 'mediapp/dashboard.html', context)
+
+@login_required
+def dashboard(request):
+    predictions = Prediction.objects.filter(user=request.user)
+
+    cursor = request.GET.get('cursor')
+    with timed('dashboard_queries'):
+        # Summary figures come from the user's running totals row
+        stats = PredictionStats.for_user(request.user)
+
+        # Per-day average cost for the recent history chart, oldest first
+        daily = list(daily_costs(predictions, stats))
+
+        # One keyset page of the history table
+        page, next_cursor = keyset_page(history_columns(predictions), cursor)
+
+    context = dashboard_context(stats, daily, page, next_cursor, cursor)
+    with timed('render'):
+        return render(request, 'mediapp/dashboard.html', context)
 
 @login_required
 def profile(request):
@@ -118,6 +167,25 @@ def profile(request):
     }
     return render(request, 'mediapp/profile.html', context)
 
+@timed('save_prediction')
+def save_prediction(prediction):
+    """Save a priced prediction and update its owner's totals in one transaction"""
+    with transaction.atomic():
+        prediction.save()
+        PredictionStats.record(prediction.user, [prediction])
+
+def explain_prediction(prediction):
+    # Store the quote's per-feature breakdown on the row, so the result page
+    # only reads it; a failure here never blocks the quote itself
+    from mediapp.ml_models.predict import explain
+    try:
+        prediction.set_explanation(explain(
+            prediction.age, prediction.gender, prediction.bmi,
+            prediction.children, prediction.smoker, prediction.region,
+        ))
+    except Exception:
+        logger.exception('Could not explain prediction for %s', prediction.user)
+
 @login_required
 def prediction_new(request):
     if request.method == 'POST':
@@ -126,6 +194,7 @@ def prediction_new(request):
             prediction = form.save(commit=False)
             prediction.user = request.user
             
+            from mediapp.ml_models.predict import predict
             try:
                 # Call the predict function
                 cost = predict(
@@ -137,24 +206,128 @@ def prediction_new(request):
                     region=prediction.region
                 )
                 prediction.predicted_cost = round(cost, 2)
-                prediction.save()
+                explain_prediction(prediction)
+                save_prediction(prediction)
                 messages.success(request, 'Prediction successful!')
                 return redirect('prediction_result', prediction_id=prediction.id)
             except Exception as e:
                 messages.error(request, f'Prediction error: {str(e)}')
     else:
         form = PredictionForm()
-    return render(request, 'mediapp/prediction_form.html', {'form': form})
+    with timed('render'):
+        return render(request, 'mediapp/prediction_form.html', {'form': form})
+
 
+def _parse_applicants(request):
+    # Accept either a JSON array or newline-delimited JSON objects. Any other
+    # single JSON document is returned as is for the caller to reject
+    body = request.body.decode('utf-8')
+    if 'ndjson' not in request.content_type:
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            # Several lines of objects do not parse as one document
+            if body.lstrip().startswith('['):
+                raise
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
 
 @login_required
-def prediction_result(request, prediction_id):
+@require_POST
+def prediction_batch(request):
+    """
+    Price many applicants at once; pass ?save=1 to store them as predictions
+    and ?explain=1 to get each cost's per-feature contributions
+    """
+    import numpy as np
+    from mediapp.ml_models.predict import encode_batch, explain_batch, predict_batch
+
     try:
-        prediction = Prediction.objects.get(id=prediction_id, user=request.user)
-    except Prediction.DoesNotExist:
-        messages.error(request, 'Prediction not found.')
-        return redirect('dashboard')
-    
+        records = _parse_applicants(request)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return JsonResponse({'errors': [f'Invalid JSON: {e}']}, status=400)
+    if not isinstance(records, list) or not records:
+        return JsonResponse({'errors': ['Expected a non-empty list of applicants']}, status=400)
+
+    try:
+        X = encode_batch(records)
+    except ValueError as e:
+        return JsonResponse({'errors': [str(e)]}, status=400)
+    errors = clean_batch(X)
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    costs = np.round(predict_batch(X), 2).tolist()
+    results = [{'predicted_cost': cost} for cost in costs]
+
+    save = request.GET.get('save') in ('1', 'true')
+    explanation = None
+    if save or request.GET.get('explain') in ('1', 'true'):
+        explanation = explain_batch(X)
+    extra = {}
+    if explanation is not None and request.GET.get('explain') in ('1', 'true'):
+        extra['base_cost'] = round(explanation['base_cost'], 2)
+        extra['attribution'] = explanation['method']
+        for result, row in zip(results, explanation['contributions'].round(2).tolist()):
+            result['contributions'] = dict(zip(FEATURES, row))
+
+    if save:
+        with transaction.atomic():
+            # Saved from the validated matrix, not the raw JSON, so a row
+            # stores exactly what was priced ("30.0" becomes 30)
+            predictions = [
+                Prediction(
+                    user=request.user,
+                    age=int(age),
+                    gender=LABELS['sex'][sex],
+                    bmi=bmi,
+                    children=int(children),
+                    smoker=LABELS['smoker'][smoker],
+                    region=LABELS['region'][region],
+                    predicted_cost=cost,
+                )
+                for (age, sex, bmi, children, smoker, region), cost in zip(X.tolist(), costs)
+            ]
+            for row, prediction in enumerate(predictions):
+                prediction.set_explanation(explanation, row)
+            predictions = Prediction.objects.bulk_create(predictions, batch_size=1000)
+            PredictionStats.record(request.user, predictions)
+        for result, prediction in zip(results, predictions):
+            result['id'] = prediction.id
+
+    return JsonResponse({'count': len(results), 'features': FEATURES, **extra, 'predictions': results})
+
+
+@login_required
+def prediction_history(request):
+    """Newest-first JSON history; follow next_cursor for older predictions"""
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), 100)
+    except ValueError:
+        return JsonResponse({'errors': ['limit must be an integer']}, status=400)
+
+    page, next_cursor = keyset_page(
+        Prediction.objects.filter(user=request.user),
+        request.GET.get('cursor'),
+        page_size=limit,
+    )
+    results = [
+        {
+            'id': p.id,
+            'created_at': p.created_at.isoformat(),
+            'age': p.age,
+            'gender': p.gender,
+            'bmi': p.bmi,
+            'children': p.children,
+            'smoker': p.smoker,
+            'region': p.region,
+            'predicted_cost': p.predicted_cost,
+        }
+        for p in page
+    ]
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
+
+
+def result_context(prediction, avg_cost):
     # Calculate risk level
     if prediction.predicted_cost < 5000:
         risk_level = "Low"
@@ -166,10 +339,6 @@ def prediction_result(request, prediction_id):
         risk_level = "High"
         risk_color = "#F44336"  # Red
     
-    # Get average cost for comparison
-    user_predictions = Prediction.objects.filter(user=request.user)
-    avg_cost = sum(p.predicted_cost for p in user_predictions) / len(user_predictions) if user_predictions else 0
-    
     # Prepare comparison data
     comparison = {
         'user_avg': avg_cost,
@@ -177,29 +346,112 @@ def prediction_result(request, prediction_id):
         'percent_diff': ((prediction.predicted_cost - avg_cost) / avg_cost) * 100 if avg_cost > 0 else 0
     }
     
-    context = {
+    return {
         'prediction': prediction,
         'risk_level': risk_level,
         'risk_color': risk_color,
         'comparison': comparison
     }
-    return render(request, 'mediapp/prediction_result.html', context)
 
 
-model_path = os.path.join(settings.BASE_DIR, 'mediapp', 'ml_models', 'insurance_model.pkl')
-model = joblib.load(model_path)
+def what_if_context(prediction):
+    # Counterfactual prices for the result page, which still renders without them
+    from mediapp.ml_models.predict import what_if
+    try:
+        return what_if(prediction.id, prediction.age, prediction.gender, prediction.bmi,
+                       prediction.children, prediction.smoker, prediction.region)
+    except Exception:
+        logger.exception('What-if pricing failed for prediction %s', prediction.id)
+        return None
 
-def estimate_cost(request):
-    if request.method == 'POST':
-        # Get form data
-        input_data = [age, sex, bmi, ...]  
-        prediction = predict(input_data)
-        return render(request, 'result.html', {'prediction': prediction})
-
-def predict_charge(input_data):
-    # Convert input to DataFrame with matching feature names
-    input_df = pd.DataFrame([input_data], 
-                          columns=['age', 'sex', 'bmi', 'children', 'smoker', 'region'])
+
+@login_required
+def prediction_result(request, prediction_id):
+    try:
+        prediction = Prediction.objects.get(id=prediction_id, user=request.user)
+    except Prediction.DoesNotExist:
+        messages.error(request, 'Prediction not found.')
+        return redirect('dashboard')
     
-    prediction = model.predict(input_df)  # Now maintains feature names
-    return prediction[0]
\ No newline at end of file
+    # Get average cost for comparison
+    avg_cost = PredictionStats.for_user(request.user).avg_cost
+    context = result_context(prediction, avg_cost)
+    context['what_if'] = what_if_context(prediction)
+    with timed('render'):
+        return render(request, 'mediapp/prediction_result.html', context)
+
+
+@login_required
+def prediction_what_if(request, prediction_id):
+    """Price variants of a stored prediction (non-smoker, BMI -5, ...) and BMI/age curves; nothing is saved"""
+    from mediapp.ml_models.predict import what_if
+
+    try:
+        prediction = Prediction.objects.get(id=prediction_id, user=request.user)
+    except Prediction.DoesNotExist:
+        return JsonResponse({'errors': ['Prediction not found']}, status=404)
+    result = what_if(prediction.id, prediction.age, prediction.gender, prediction.bmi,
+                     prediction.children, prediction.smoker, prediction.region)
+    return JsonResponse({'prediction_id': prediction.id, **result})
+
+
+@staff_member_required
+def model_info(request):
+    """Report the serving model's version, how long it took to load and cache hit rates"""
+    from mediapp.ml_models.predict import micro_batcher, prediction_cache, registry, whatif_cache
+
+    return JsonResponse({
+        **registry.info(),
+        'prediction_cache': prediction_cache.stats(),
+        'what_if_cache': whatif_cache.stats(),
+        'micro_batcher': micro_batcher.stats() if micro_batcher else None,
+    })
+
+def _model_metrics():
+    # Model, cache and micro-batcher state as Prometheus text lines. A process
+    # that has not served a prediction yet has nothing to report, and a scrape
+    # should not be what imports the model stack
+    if 'mediapp.ml_models.predict' not in sys.modules:
+        return gauge('medicost_model_loaded', 'Whether a model is loaded in this process.', 0)
+    from mediapp.ml_models.predict import micro_batcher, prediction_cache, registry
+
+    info = registry.info()
+    lines = gauge('medicost_model_loaded', 'Whether a model is loaded in this process.', int(info['loaded']))
+    if info['loaded']:
+        lines += gauge('medicost_model_info', 'Version of the serving model.', 1, version=info['version'])
+        lines += gauge('medicost_model_load_seconds', 'Time spent loading the serving model.', info['load_seconds'])
+        lines += gauge('medicost_model_loaded_timestamp_seconds', 'When the serving model was loaded.', info['loaded_at'])
+
+    cache = prediction_cache.stats()
+    lines += gauge('medicost_prediction_cache_hits_total', 'Prediction cache hits.', cache['hits'], 'counter')
+    lines += gauge('medicost_prediction_cache_misses_total', 'Prediction cache misses.', cache['misses'], 'counter')
+    lines += gauge('medicost_prediction_cache_size', 'Entries in the prediction cache.', cache['size'])
+    lines += gauge('medicost_prediction_cache_hit_ratio', 'Share of prediction cache lookups that hit.', cache['hit_rate'])
+
+    if micro_batcher is not None:
+        batches = micro_batcher.stats()
+        name = 'medicost_micro_batch_size'
+        lines += [f'# HELP {name} Rows scored per micro-batch.', f'# TYPE {name} histogram']
+        cumulative = 0
+        for bound, n in batches['batch_size_buckets'].items():
+            cumulative += n
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines += [f'{name}_sum {batches["rows"]}', f'{name}_count {batches["batches"]}']
+        lines += gauge('medicost_micro_batch_score_seconds_total', 'Time spent scoring micro-batches.',
+                       batches['score_seconds_total'], 'counter')
+        lines += gauge('medicost_micro_batch_wait_seconds_total', 'Time rows spent queued for a micro-batch.',
+                       batches['wait_seconds_total'], 'counter')
+    return lines
+
+def metrics(request):
+    """Expose this process's request, stage, model and cache metrics in Prometheus text format"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        # No token configured: closed, except to local scrapers in development
+        allowed = settings.DEBUG and request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1')
+    if not allowed:
+        return HttpResponse(status=403)
+    lines = request_latency.collect() + stage_latency.collect() + _model_metrics()
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
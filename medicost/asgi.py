@@ -3,6 +3,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from medicost.db import enable_sqlite_wal
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicost.settings')
 
 application = get_asgi_application()
+
+# SQLite switches to WAL for serving only; see medicost.db
+enable_sqlite_wal()
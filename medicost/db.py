@@ -0,0 +1,17 @@
+from django.conf import settings
+
+SQLITE_WAL_INIT = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+
+
+def enable_sqlite_wal():
+    """
+    Open every later SQLite connection in WAL mode, if settings.SQLITE_WAL.
+
+    WAL is stored in the database file itself, so only the server entry
+    points (medicost.wsgi, medicost.asgi) and the write benchmark switch it
+    on; manage.py commands such as check or migrate leave the file as it is.
+    Connections already open keep their journal mode.
+    """
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3' and getattr(settings, 'SQLITE_WAL', False):
+        database['OPTIONS']['init_command'] = SQLITE_WAL_INIT
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mediapp.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,12 +51,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'medicost.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database: SQLite by default. Set DB_ENGINE=postgresql (with DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST, DB_PORT) when several workers write predictions.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'medicost'),
+            'USER': os.environ.get('DB_USER', 'medicost'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    # A psycopg connection pool per process (needs psycopg[pool]); Django
+    # does not allow persistent connections on top of a pool, so DB_POOL=0
+    # falls back to keeping each thread's connection for DB_CONN_MAX_AGE seconds
+    if os.environ.get('DB_POOL', '1') == '1':
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Writers wait for the lock instead of failing, and take it
+                # when the transaction starts so two of them cannot deadlock
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# WAL lets SQLite readers run alongside the single writer. It is switched on
+# when the server starts (medicost.db.enable_sqlite_wal), not here, so
+# manage.py commands do not rewrite the database file; DB_SQLITE_WAL=0 keeps
+# the rollback journal
+SQLITE_WAL = os.environ.get('DB_SQLITE_WAL', '1') == '1'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -82,13 +124,49 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Prediction model: load it in the server master before workers fork, and
+# memory-map its arrays so all workers share one copy
+MODEL_PRELOAD = True
+MODEL_MMAP_MODE = 'r'
+
+# Tree models are served from their flattened node array, which beats the
+# sklearn/xgboost estimators for small batches only; larger batches (e.g.
+# score_file chunks) load the native estimator instead
+TREE_ENSEMBLE_MAX_ROWS = 128
+
+# The dashboard chart shows this many days up to the user's latest prediction
+DASHBOARD_CHART_DAYS = 90
+
+# Distinct prediction inputs memoized per process (0 disables the cache)
+PREDICTION_CACHE_SIZE = 10000
+
+# Serve the prediction, result and dashboard pages with the async views
+# (for ASGI deployments); async inference runs on this many threads
+ASYNC_VIEWS = False
+INFERENCE_THREADS = 4
+
+# Micro-batching: concurrent predictions that miss the cache and price grid
+# wait up to MICRO_BATCH_WAIT_MS for others and are scored together, at most
+# MICRO_BATCH_MAX_ROWS per model call. Only useful with threaded or async
+# workers; async views can batch at most INFERENCE_THREADS rows at a time.
+# Quotes answered by the price grid never reach the batcher, so with the
+# shipped linear model this has no effect; it applies to models without a
+# grid (tree ensembles, SVR).
+MICRO_BATCH_ENABLED = False
+MICRO_BATCH_WAIT_MS = 2.0
+MICRO_BATCH_MAX_ROWS = 64
+
+# /metrics serves Prometheus text to scrapers that send METRICS_TOKEN as a
+# bearer token. Without a token it is closed (only loopback with DEBUG on)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
-# For production, use SMTP:
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# For development, set EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend
+# (or locmem) in the environment; production uses SMTP
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -96,4 +174,12 @@ EMAIL_HOST_USER = 'nicher254@gmail.com'
 EMAIL_HOST_PASSWORD = 'Nicher"1679#'
 
 DEFAULT_FROM_EMAIL = 'noreply@medicost.com'
-ADMIN_EMAIL = 'nicher254@gmail.com'
\ No newline at end of file
+ADMIN_EMAIL = 'nicher254@gmail.com'
+
+# Outgoing mail is queued in OutboxEmail and sent by `manage.py send_outbox`.
+# Failed sends retry after 30s, 60s, 120s, ... up to an hour between tries.
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 3600
+# A worker has this long to send a claimed batch before others may retake it
+OUTBOX_LEASE_SECONDS = 300
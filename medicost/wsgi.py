@@ -1,8 +1,20 @@
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from medicost.db import enable_sqlite_wal
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicost.settings')
 
 application = get_wsgi_application()
+
+# SQLite switches to WAL for serving only; see medicost.db
+enable_sqlite_wal()
+
+# With gunicorn --preload this module is imported once in the master, so
+# loading the model here lets every forked worker share the same copy
+if getattr(settings, 'MODEL_PRELOAD', True):
+    from mediapp.ml_models.registry import registry
+    registry.preload()